@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Generator of large, realistic interfaces trees for the benchmarks.
+
+Usage: ``python -m benchmarks.generate DIRECTORY [--interfaces N] [--depth N]``.
+"""
+import argparse
+import os
+__author__ = 'vahid'
+
+
+def _physical(i):
+    return [
+        'auto eth%d' % i,
+        'iface eth%d inet manual' % i,
+        '  mtu 9000',
+        '',
+    ]
+
+
+def _bond(i, slaves):
+    return [
+        'auto bond%d' % i,
+        'iface bond%d inet manual' % i,
+        '  bond-slaves %s' % ' '.join(slaves),
+        '  bond-mode 802.3ad',
+        '  bond-miimon 100',
+        '',
+    ]
+
+
+def _vlan(bond, vid):
+    octet2, octet3 = divmod(vid, 250)
+    return [
+        '# Customer VLAN %d' % vid,
+        'auto bond%d.%d' % (bond, vid),
+        'iface bond%d.%d inet static' % (bond, vid),
+        '  address 10.%d.%d.1' % (octet2, octet3),
+        '  netmask 255.255.255.0',
+        '  network 10.%d.%d.0' % (octet2, octet3),
+        '  broadcast 10.%d.%d.255' % (octet2, octet3),
+        '  vlan-raw-device bond%d' % bond,
+        '  post-up ip route add 172.16.%d.0/24 via 10.%d.%d.254' % (vid % 250, octet2, octet3),
+        '  post-up ip rule add from 10.%d.%d.0/24 table %d' % (octet2, octet3, vid),
+        '',
+    ]
+
+
+def _bridge(i, port):
+    return [
+        'auto br%d' % i,
+        'iface br%d inet dhcp' % i,
+        '  bridge_ports %s' % port,
+        '  bridge_stp off',
+        '  bridge_fd 0',
+        '',
+        'iface br%d inet6 auto' % i,
+        '  autoconf 1',
+        '',
+    ]
+
+
+def _mapping(i):
+    return [
+        'mapping map%d' % i,
+        '  script /usr/local/sbin/map-scheme',
+        '  map HOME map%d-home' % i,
+        '  map WORK map%d-work' % i,
+        '',
+        'iface map%d-home inet dhcp' % i,
+        '',
+        'iface map%d-work inet static' % i,
+        '  address 192.168.%d.10' % (i % 250),
+        '  netmask 255.255.255.0',
+        '',
+    ]
+
+
+def _write(filename, lines):
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines))
+
+
+def generate(directory, interfaces=2000, depth=3, files_per_level=8):
+    """Writes a tree of about ``interfaces`` iface stanzas under ``directory`` and returns the root filename.
+
+    The root file sources a ``loopback`` file, a ``interfaces.d`` source-directory and a glob source. The
+    VLANs are spread over the files of the directories, each level nesting another ``source-directory``
+    down to ``depth``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    bonds = max(1, interfaces // 100)
+    bridges = max(1, interfaces // 50)
+    mappings = max(1, interfaces // 100)
+    vlans = max(1, interfaces - bonds * 3 - bridges * 2 - mappings * 2)
+
+    root = os.path.join(directory, 'interfaces')
+    physical = []
+    for b in range(bonds):
+        physical += _physical(b * 2) + _physical(b * 2 + 1) + _bond(b, ['eth%d' % (b * 2), 'eth%d' % (b * 2 + 1)])
+
+    _write(root, [
+        '# Generated by benchmarks.generate',
+        '',
+    ] + physical + [
+        'source loopback',
+        'source-directory interfaces.d',
+        'source bridges.d/*',
+    ])
+    _write(os.path.join(directory, 'loopback'), ['auto lo', 'iface lo inet loopback', ''])
+
+    os.makedirs(os.path.join(directory, 'bridges.d'), exist_ok=True)
+    for i in range(bridges):
+        lines = _bridge(i, 'eth%d' % (i % (bonds * 2)))
+        if i < mappings:
+            lines += _mapping(i)
+        _write(os.path.join(directory, 'bridges.d', 'br%d' % i), lines)
+
+    level_dir = os.path.join(directory, 'interfaces.d')
+    files = max(1, depth * files_per_level)
+    per_file = max(1, vlans // files)
+    vid = 0
+    for level in range(depth):
+        os.makedirs(level_dir, exist_ok=True)
+        for n in range(files_per_level):
+            lines = []
+            count = per_file if (level, n) != (depth - 1, files_per_level - 1) else vlans - vid
+            for _ in range(count):
+                lines += _vlan(vid % bonds, vid + 2)
+                vid += 1
+            if n == 0 and level < depth - 1:
+                lines.append('source-directory nested')
+            _write(os.path.join(level_dir, 'vlans%d' % n), lines)
+        level_dir = os.path.join(level_dir, 'nested')
+    return root
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates a large interfaces tree.')
+    parser.add_argument('directory')
+    parser.add_argument('--interfaces', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=3)
+    args = parser.parse_args(argv)
+    print(generate(args.directory, args.interfaces, args.depth))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of parsing, lookups, mutations, rendering, saving and hashing on a large generated tree.
+
+Usage::
+
+    python -m benchmarks.run [--interfaces N] [--repeat N] [--output results.json]
+                             [--baseline baseline.json [--tolerance 1.0]] [--save-baseline baseline.json]
+
+The results are written as JSON. When a baseline is given, every metric slower, or bigger, than the
+baseline by more than the tolerance is reported and the exit status is 1. Reruns on one machine vary
+by up to half of the timings, so the default tolerance only catches the slowdowns of at least twice.
+``BASELINE`` holds the results of the default run on the machine of its ``meta``.
+"""
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Iface, Snapshot, write_snapshot
+from .generate import generate
+__author__ = 'vahid'
+
+
+BASELINE = join(dirname(abspath(__file__)), 'baseline.json')
+
+
+def _names(f):
+    return [i.name for sub_file in f.iter_files() for i in sub_file.interfaces + sub_file.mappings]
+
+
+def bench_load(root, directory):
+    return lambda: InterfacesFile(root)
+
+
+def bench_load_snapshot(root, directory):
+    filename = write_snapshot(InterfacesFile(root), join(directory, '..', 'interfaces.snapshot'))
+    return lambda: InterfacesFile(root, cache=Snapshot(filename))
+
+
+def bench_get_iface(root, directory):
+    f = InterfacesFile(root)
+    names = _names(f)
+
+    def run():
+        for name in names:
+            f.get_iface(name)
+    return run
+
+
+def bench_add_iface(root, directory):
+    f = InterfacesFile(root)
+    ifaces = [Iface(f.filename, 'iface', 'dummy%d' % i, 'inet', 'manual') for i in range(5000)]
+
+    def run():
+        for iface in ifaces:
+            f.add_iface(iface)
+    return run
+
+
+def bench_mutate(root, directory):
+    f = InterfacesFile(root)
+    ifaces = [i for sub_file in f.iter_files() for i in sub_file.interfaces]
+
+    def run():
+        for iface in ifaces:
+            iface.mtu = '1500'
+    return run
+
+
+def bench_as_string(root, directory):
+    f = InterfacesFile(root)
+    return lambda: [sub_file.as_string(validate=False) for sub_file in f.iter_files()]
+
+
+def bench_as_string_cached(root, directory):
+    f = InterfacesFile(root)
+    files = list(f.iter_files())
+    for sub_file in files:
+        sub_file.as_string(validate=False)
+    return lambda: [sub_file.as_string(validate=False) for sub_file in files]
+
+
+def _copy(directory):
+    # Inside the directory of the generated tree, removed with it.
+    target = tempfile.mkdtemp(dir=join(directory, '..'))
+    shutil.copytree(directory, join(target, 'tree'))
+    return join(target, 'tree', 'interfaces')
+
+
+def bench_save(root, directory):
+    f = InterfacesFile(_copy(directory))
+    return lambda: f.save(recursive=True, validate=False)
+
+
+def bench_save_unchanged(root, directory):
+    f = InterfacesFile(_copy(directory))
+    f.save(recursive=True, validate=False)
+    return lambda: f.save(recursive=True, validate=False)
+
+
+def bench_save_one_change(root, directory):
+    f = InterfacesFile(_copy(directory))
+    f.save(recursive=True, validate=False)
+    iface = f.get_iface('lo')
+
+    def run():
+        iface.mtu = '1500' if iface.get_all('mtu') != ['1500'] else '65536'
+        f.save(recursive=True, validate=False)
+    return run
+
+
+def bench_hash(root, directory):
+    f = InterfacesFile(root)
+    return lambda: [hash(sub_file) for sub_file in f.iter_files()]
+
+
+BENCHMARKS = [
+    ('load', bench_load),
+    ('load_snapshot', bench_load_snapshot),
+    ('get_iface', bench_get_iface),
+    ('add_iface', bench_add_iface),
+    ('mutate', bench_mutate),
+    ('as_string', bench_as_string),
+    ('as_string_cached', bench_as_string_cached),
+    ('save', bench_save),
+    ('save_unchanged', bench_save_unchanged),
+    ('save_one_change', bench_save_one_change),
+    ('hash', bench_hash),
+]
+
+
+def measure(setup, root, directory, repeat):
+    """Best wall time of ``repeat`` runs, each on a fresh setup."""
+    best = None
+    for _ in range(repeat):
+        run = setup(root, directory)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure_memory(root):
+    tracemalloc.start()
+    try:
+        f = InterfacesFile(root)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del f
+    return {'load_peak_bytes': peak, 'tree_bytes': current}
+
+
+def run(interfaces=2000, depth=3, repeat=15):
+    directory = tempfile.mkdtemp()
+    try:
+        root = generate(join(directory, 'tree'), interfaces, depth)
+        results = {'seconds': {}, 'memory': measure_memory(root)}
+        for name, setup in BENCHMARKS:
+            results['seconds'][name] = measure(setup, root, join(directory, 'tree'), repeat)
+    finally:
+        shutil.rmtree(directory)
+
+    results['meta'] = {
+        'interfaces': interfaces,
+        'depth': depth,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns the ``(metric, baseline, current, ratio)`` of the metrics that regressed."""
+    regressions = []
+    for group in ('seconds', 'memory'):
+        for name, expected in baseline.get(group, {}).items():
+            current = results[group].get(name)
+            if current is None or not expected:
+                continue
+            ratio = current / expected
+            if ratio > 1 + tolerance:
+                regressions.append(('%s.%s' % (group, name), expected, current, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interfaces', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--output', help='Writes the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compares the results with this JSON file.')
+    parser.add_argument('--save-baseline', help='Writes the results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='Allowed slowdown ratio over the baseline, default 1.0.')
+    args = parser.parse_args(argv)
+
+    results = run(args.interfaces, args.depth, args.repeat)
+    for name, seconds in results['seconds'].items():
+        print('%-20s %10.3f ms' % (name, seconds * 1000))
+    for name, size in results['memory'].items():
+        print('%-20s %10.1f KiB' % (name, size / 1024))
+
+    for filename in (args.output, args.save_baseline):
+        if filename:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for metric, expected, current, ratio in regressions:
+            print('REGRESSION %s: %.6g -> %.6g (x%.2f)' % (metric, expected, current, ratio), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
+from .cache import ParseCache
 from .constants import DEFAULT_HEADER
+from .events import ChangeEvent
+from .graph import DependencyGraph
 from .iface import Iface, Mapping, IfaceBase
+from .instrument import Instrumentation
 from .interface_file import InterfacesFile
+from .parser import iter_stanzas
+from .snapshot import Snapshot, write_snapshot
 from .source import Source, SourceDirectory
 from .stanza import Stanza, MultilineStanza
 from .startup import Allow, Auto, StartupStanza
-from .errors import ValidationError
+from .watch import Watcher
+from .errors import ValidationError, DependencyCycleError, IncludeCycleError, RollbackError
 __author__ = 'vahid'
 __version__ = '0.2.1'
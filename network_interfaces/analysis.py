@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Address and subnet consistency checks over every interface of a tree.
+
+The addresses are extracted once into packed integer columns, one :class:`AddressTable` per address
+family, and checked in bulk: overlapping subnets are found with a sweep over the subnets sorted by
+start, and duplicate addresses by sorting, so the whole analysis is O(n log n).
+"""
+import ipaddress
+from array import array
+from collections import namedtuple
+__author__ = 'vahid'
+
+
+# ``check`` is one of the constants below, ``names`` and ``filenames`` those of the interfaces involved.
+Finding = namedtuple('Finding', ['check', 'names', 'filenames', 'detail'])
+
+INVALID = 'invalid'
+OVERLAP = 'overlap'
+DUPLICATE_ADDRESS = 'duplicate-address'
+GATEWAY_OUTSIDE = 'gateway-outside'
+NETWORK_MISMATCH = 'network-mismatch'
+BROADCAST_MISMATCH = 'broadcast-mismatch'
+
+FAMILIES = {'inet': 4, 'inet6': 6}
+
+
+def _column(version):
+    # 32 bits addresses are packed in an array, Python ints hold the 128 bits ones.
+    if version == 4:
+        return array('I' if array('I').itemsize >= 4 else 'L')
+    return []
+
+
+class AddressTable(object):
+    """The addressing of the interfaces of one family, a row per interface, a column per field.
+
+    ``network`` and ``last`` are the bounds of the computed subnet, ``declared_network``,
+    ``declared_broadcast`` and ``gateway`` the configured values, ``0`` when missing, which is flagged
+    in the ``has_*`` byte arrays.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.names = []
+        self.filenames = []
+        self.address = _column(version)
+        self.prefix = array('B')
+        self.network = _column(version)
+        self.last = _column(version)
+        self.gateway = _column(version)
+        self.has_gateway = bytearray()
+        self.declared_network = _column(version)
+        self.has_network = bytearray()
+        self.declared_broadcast = _column(version)
+        self.has_broadcast = bytearray()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _optional(self, value, column, flags):
+        if value is None:
+            column.append(0)
+            flags.append(0)
+        else:
+            column.append(int(ipaddress.ip_address(value)))
+            flags.append(1)
+
+    def append(self, name, filename, address, netmask=None, gateway=None, network=None, broadcast=None):
+        """Adds a row, raises ``ValueError`` for invalid values, leaving the table unchanged."""
+        if '/' not in address and netmask:
+            address = '%s/%s' % (address, netmask)
+        interface = ipaddress.ip_interface(address)
+        if interface.version != self.version:
+            raise ValueError('%s is not an IPv%d address' % (address, self.version))
+        for value in (gateway, network, broadcast):
+            if value is not None and ipaddress.ip_address(value).version != self.version:
+                raise ValueError('%s is not an IPv%d address' % (value, self.version))
+
+        subnet = interface.network
+        self.names.append(name)
+        self.filenames.append(filename)
+        self.address.append(int(interface.ip))
+        self.prefix.append(subnet.prefixlen)
+        self.network.append(int(subnet.network_address))
+        self.last.append(int(subnet.broadcast_address))
+        self._optional(gateway, self.gateway, self.has_gateway)
+        self._optional(network, self.declared_network, self.has_network)
+        self._optional(broadcast, self.declared_broadcast, self.has_broadcast)
+
+    def address_string(self, value):
+        return str(ipaddress.IPv6Address(value) if self.version == 6 else ipaddress.IPv4Address(value))
+
+
+def _ifaces(interfaces_file):
+    stack = [interfaces_file]
+    while stack:
+        f = stack.pop()
+        yield from f.interfaces
+        if f._sub_files is not None:
+            stack.extend(reversed(f._sub_files))
+
+
+def _option(iface, key):
+    cells = iface._keys.get(key)
+    return ' '.join(cells[1:]) if cells else None
+
+
+def extract(interfaces_file):
+    """Returns the ``{family: AddressTable}`` of the interfaces with an ``address`` in the loaded files
+    of the tree, and the :data:`INVALID` findings of those whose values can't be parsed."""
+    tables = {family: AddressTable(version) for family, version in FAMILIES.items()}
+    findings = []
+    for iface in _ifaces(interfaces_file):
+        table = tables.get(iface.address_family)
+        address = _option(iface, 'address')
+        if table is None or address is None:
+            continue
+        filename = iface._owner.filename if iface._owner is not None else iface._filename
+        try:
+            table.append(iface.name, filename, address, _option(iface, 'netmask'), _option(iface, 'gateway'),
+                         _option(iface, 'network'), _option(iface, 'broadcast'))
+        except ValueError as ex:
+            findings.append(Finding(INVALID, (iface.name,), (filename,), str(ex)))
+    return tables, findings
+
+
+def overlaps(table):
+    """Yields the findings of the overlapping subnets of different interfaces.
+
+    Sweeps the subnets sorted by start, each one is reported against the widest subnet open before it.
+    """
+    order = sorted(range(len(table)), key=lambda i: (table.network[i], -table.last[i]))
+    network, last, names = table.network, table.last, table.names
+    widest = None
+    for i in order:
+        if widest is not None and network[i] <= last[widest] and names[i] != names[widest]:
+            yield Finding(OVERLAP, (names[widest], names[i]), (table.filenames[widest], table.filenames[i]),
+                          '%s/%d overlaps %s/%d' % (
+                              table.address_string(network[i]), table.prefix[i],
+                              table.address_string(network[widest]), table.prefix[widest]))
+        if widest is None or last[i] > last[widest]:
+            widest = i
+
+
+def duplicate_addresses(table):
+    """Yields a finding per address configured on more than one interface."""
+    address = table.address
+    order = sorted(range(len(table)), key=address.__getitem__)
+    start = 0
+    for end in range(1, len(order) + 1):
+        if end < len(order) and address[order[end]] == address[order[start]]:
+            continue
+        if end - start > 1:
+            rows = order[start:end]
+            yield Finding(DUPLICATE_ADDRESS, tuple(table.names[i] for i in rows),
+                          tuple(table.filenames[i] for i in rows),
+                          '%s is configured %d times' % (table.address_string(address[order[start]]), len(rows)))
+        start = end
+
+
+def consistency(table):
+    """Yields the findings of the gateways outside of their subnet, and of the declared network and
+    broadcast addresses that do not match the address and netmask."""
+    for i in range(len(table)):
+        name, filename = (table.names[i],), (table.filenames[i],)
+        subnet = '%s/%d' % (table.address_string(table.network[i]), table.prefix[i])
+        if table.has_gateway[i] and not table.network[i] <= table.gateway[i] <= table.last[i]:
+            yield Finding(GATEWAY_OUTSIDE, name, filename, 'gateway %s is outside of %s' % (
+                table.address_string(table.gateway[i]), subnet))
+        if table.has_network[i] and table.declared_network[i] != table.network[i]:
+            yield Finding(NETWORK_MISMATCH, name, filename, 'network %s does not match %s' % (
+                table.address_string(table.declared_network[i]), subnet))
+        if table.has_broadcast[i] and table.declared_broadcast[i] != table.last[i]:
+            yield Finding(BROADCAST_MISMATCH, name, filename, 'broadcast %s does not match %s' % (
+                table.address_string(table.declared_broadcast[i]), subnet))
+
+
+def analyze(interfaces_file):
+    """Returns the list of :class:`Finding` of every check, over the loaded files of the tree."""
+    tables, findings = extract(interfaces_file)
+    for table in tables.values():
+        findings += overlaps(table)
+        findings += duplicate_addresses(table)
+        findings += consistency(table)
+    return findings
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Bulk parsing of the interfaces trees of many hosts, on a process pool.
+
+Usage: ``python -m network_interfaces.audit [-j N] PATH...``. Each ``PATH`` is either a root interfaces
+file or a host snapshot directory containing ``etc/network/interfaces`` or ``interfaces``. The absolute
+sourced paths of a snapshot are read under its directory, not on the auditing host. One JSON summary, or
+failure, is printed per line as soon as it is available.
+"""
+import argparse
+import json
+import os.path
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .iface import Iface
+from .interface_file import InterfacesFile
+__author__ = 'vahid'
+
+
+InterfaceSummary = namedtuple('InterfaceSummary', [
+    'name', 'type', 'address_family', 'method', 'address', 'netmask', 'startup', 'filename'])
+HostSummary = namedtuple('HostSummary', ['host', 'filename', 'digest', 'interfaces'])
+AuditFailure = namedtuple('AuditFailure', ['host', 'filename', 'error'])
+
+SNAPSHOT_CANDIDATES = ('etc/network/interfaces', 'interfaces')
+
+
+def resolve(path):
+    """Returns the ``(host, root filename)`` of a root interfaces file or a host snapshot directory."""
+    if not os.path.isdir(path):
+        return os.path.basename(os.path.dirname(os.path.abspath(path))), os.path.abspath(path)
+
+    for candidate in SNAPSHOT_CANDIDATES:
+        filename = os.path.join(path, candidate)
+        if os.path.isfile(filename):
+            return os.path.basename(os.path.abspath(path)), os.path.abspath(filename)
+    raise FileNotFoundError('No interfaces file in %s' % path)
+
+
+def summarize(filename, host=None, rootdir=None):
+    """The :class:`HostSummary` of the tree of ``filename``, its absolute sources read under ``rootdir``."""
+    f = InterfacesFile(os.path.abspath(filename), rootdir=rootdir)
+    interfaces = []
+    for sub_file in f.iter_files():
+        for iface in sub_file.interfaces + sub_file.mappings:
+            is_iface = isinstance(iface, Iface)
+            interfaces.append(InterfaceSummary(
+                iface.name,
+                iface._type,
+                iface.address_family if is_iface else None,
+                iface.method if is_iface else None,
+                iface['address'] if 'address' in iface else None,
+                iface['netmask'] if 'netmask' in iface else None,
+                iface.startup.mode if iface.startup else None,
+                sub_file.absolute_filename,
+            ))
+    return HostSummary(host, f.filename, f.digest(recursive=True).hex(), tuple(interfaces))
+
+
+def _audit_one(path):
+    host, filename = None, path
+    try:
+        host, filename = resolve(path)
+        return summarize(filename, host, os.path.abspath(path) if os.path.isdir(path) else None)
+    except Exception as ex:
+        return AuditFailure(host, filename, '%s: %s' % (type(ex).__name__, ex))
+
+
+def audit(paths, max_workers=None, executor=None):
+    """Parses every path on a process pool, or on ``executor``, and yields a :class:`HostSummary` or an
+    :class:`AuditFailure` per path as soon as it completes. A failing host does not stop the batch.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    futures = []
+    try:
+        futures = [executor.submit(_audit_one, path) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+
+def as_dict(result):
+    result = result._asdict()
+    if 'interfaces' in result:
+        result['interfaces'] = [i._asdict() for i in result['interfaces']]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='network-interfaces-audit', description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', metavar='PATH')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of worker processes.')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for result in audit(args.paths, max_workers=args.jobs):
+        if isinstance(result, AuditFailure):
+            failures += 1
+        sys.stdout.write(json.dumps(as_dict(result)) + '\n')
+        sys.stdout.flush()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .parser import tokenize_data
+from .scan import DirectoryScanner
+__author__ = 'vahid'
+
+
+class ParseCache(object):
+    """LRU cache of tokenized and parsed files, keyed by absolute path.
+
+    An entry holds the records of a file and, once a tree has loaded it, its stanzas: the next trees
+    get copies of them instead of parsing the records again. The ``source dir/*`` globs are expanded
+    on every load, their directory may change without the file changing.
+
+    An entry is reused as long as the file's ``(mtime, size, inode)`` is unchanged. With ``digest=True``
+    the file is read on every lookup and its SHA-256 is compared instead, which is immune to coarse
+    mtime resolution but still skips the parsing.
+
+    ``scanner`` is the :class:`~network_interfaces.scan.DirectoryScanner` the trees using the cache list
+    their sourced directories with, so the listings survive across loads too.
+    """
+
+    def __init__(self, maxsize=256, digest=False, scanner=None):
+        self.maxsize = maxsize
+        self.digest = digest
+        self.scanner = scanner if scanner is not None else DirectoryScanner()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+        self.scanner.clear()
+
+    def invalidate(self, filename):
+        with self._lock:
+            self._entries.pop(os.path.abspath(filename), None)
+
+    def _lookup(self, filename, key, instrument=None):
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                result = entry[1]
+            else:
+                self.misses += 1
+                result = None
+
+        if instrument is not None:
+            instrument.count('cache_misses' if result is None else 'cache_hits')
+        return result
+
+    def _store(self, filename, key, records):
+        with self._lock:
+            self._entries[filename] = (key, records, None)
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def prototypes(self, filename, records):
+        """The stanzas cached for the ``records`` of ``filename``, one per record, ``None`` for the
+        records to expand on each load, or ``None`` when the entry has no stanzas or other records."""
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry is not None and entry[1] is records:
+            return entry[2]
+
+    def store_prototypes(self, filename, records, prototypes):
+        """Caches the stanzas parsed from the ``records`` of ``filename``, the cache keeps them."""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[1] is records:
+                self._entries[filename] = (entry[0], records, prototypes)
+
+    @staticmethod
+    def _read(f, instrument):
+        if instrument is None:
+            return f.read()
+        with instrument.timer('read'):
+            return f.read()
+
+    def read_records(self, filename, instrument=None):
+        filename = os.path.abspath(filename)
+        if instrument is not None:
+            instrument.count('files_opened')
+
+        with open(filename, 'rb') as f:
+            if self.digest:
+                content = self._read(f, instrument)
+                key = hashlib.sha256(content).digest()
+            else:
+                st = os.fstat(f.fileno())
+                key = (st.st_mtime_ns, st.st_size, st.st_ino)
+                content = None
+
+            records = self._lookup(filename, key, instrument)
+            if records is not None:
+                return records
+
+            if content is None:
+                content = self._read(f, instrument)
+
+        records = tokenize_data(content, filename, instrument)
+        self._store(filename, key, records)
+        return records
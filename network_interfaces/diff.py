@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Structural diff and patch of two interfaces trees.
+
+A patch is a list of :class:`Change`, ordered file by file, parents first. Every field is a string, a
+list or a dict of them, so ``[list(c) for c in patch]`` can be sent as JSON and rebuilt with
+``[Change(*c) for c in data]``.
+"""
+import os.path
+from collections import namedtuple
+
+from .errors import PatchError
+from .iface import Iface, IfaceBase
+from .source import Source, SourceDirectory
+from .stanza import Stanza, MultilineStanza
+__author__ = 'vahid'
+
+
+ADD = 'add'
+REMOVE = 'remove'
+CHANGE = 'change'
+
+# ``filename`` is relative to the directory of the root file, ``None`` for the root file itself.
+# ``key`` identifies the stanza in its file: ``[type, name]``, plus the address family of the ifaces.
+# Added stanzas carry their ``headers``, ``startup`` mode and ``options`` as a list of cells lists.
+# Changed ones carry the new ``headers`` and ``startup`` when they changed, ``''`` for a removed
+# startup, and ``options`` as a ``{key: [values]}`` dict of the changed keys, ``[]`` when removed.
+Change = namedtuple('Change', ['op', 'filename', 'key', 'headers', 'startup', 'options'])
+
+
+def stanza_key(stanza):
+    if isinstance(stanza, Iface):
+        return [stanza._type, stanza.name, stanza.address_family]
+    if isinstance(stanza, IfaceBase):
+        return [stanza._type, stanza.name]
+    return list(stanza._headers[:2])
+
+
+def _loaded_files(interfaces_file):
+    stack = [interfaces_file]
+    while stack:
+        f = stack.pop()
+        yield f
+        if f._sub_files is not None:
+            stack.extend(reversed(f._sub_files))
+
+
+def _file_key(f, root_dirname):
+    if f.parent is None:
+        return None
+    return os.path.relpath(f.absolute_filename, root_dirname)
+
+
+def _files(interfaces_file):
+    root = interfaces_file.root
+    root_dirname = root.absolute_dirname
+    return [(_file_key(f, root_dirname), f) for f in _loaded_files(root)]
+
+
+def _stanzas(f):
+    # Key -> stanzas, the repeated keys are paired in order.
+    result = {}
+    for stanza in f.interfaces + f.mappings + f.sources:
+        result.setdefault(tuple(stanza_key(stanza)), []).append(stanza)
+    return result
+
+
+def _startup_mode(stanza):
+    startup = getattr(stanza, 'startup', None)
+    return startup.mode if startup else None
+
+
+def _options(stanza):
+    result = {}
+    if isinstance(stanza, MultilineStanza):
+        for cells in stanza._items:
+            result.setdefault(cells[0], []).append(' '.join(cells[1:]))
+    return result
+
+
+def _added(filename, stanza):
+    items = [list(c) for c in stanza._items] if isinstance(stanza, MultilineStanza) else []
+    return Change(ADD, filename, stanza_key(stanza), list(stanza._headers), _startup_mode(stanza), items)
+
+
+def _changed(filename, old, new):
+    headers = list(new._headers) if old._headers != new._headers else None
+    old_startup, new_startup = _startup_mode(old), _startup_mode(new)
+    startup = (new_startup or '') if old_startup != new_startup else None
+
+    old_options, new_options = _options(old), _options(new)
+    options = {}
+    for key, values in new_options.items():
+        if old_options.get(key) != values:
+            options[key] = values
+    for key in old_options:
+        if key not in new_options:
+            options[key] = []
+
+    if headers is None and startup is None and not options:
+        return None
+    return Change(CHANGE, filename, stanza_key(new), headers, startup, options)
+
+
+def _diff_file(filename, old, new):
+    changes = []
+    old_stanzas = _stanzas(old) if old is not None else {}
+    new_stanzas = _stanzas(new) if new is not None else {}
+
+    for key, stanzas in old_stanzas.items():
+        for stanza in stanzas[len(new_stanzas.get(key, ())):]:
+            changes.append(Change(REMOVE, filename, stanza_key(stanza), None, None, None))
+
+    for key, stanzas in new_stanzas.items():
+        previous = old_stanzas.get(key, ())
+        for i, stanza in enumerate(stanzas):
+            if i >= len(previous):
+                changes.append(_added(filename, stanza))
+            # The digests are memoized, the unchanged stanzas are skipped without comparing them.
+            elif previous[i].digest() != stanza.digest():
+                change = _changed(filename, previous[i], stanza)
+                if change is not None:
+                    changes.append(change)
+    return changes
+
+
+def diff(old, new):
+    """Returns the list of :class:`Change` turning the tree of ``old`` into the one of ``new``.
+
+    The files are matched by their path relative to the directory of their root file, so the two trees
+    may live in different directories. Only the loaded sub-files of lazy trees are compared.
+    """
+    old_files = dict(_files(old))
+    changes = []
+    for filename, f in _files(new):
+        changes += _diff_file(filename, old_files.pop(filename, None), f)
+    for filename, f in old_files.items():
+        changes += _diff_file(filename, f, None)
+    return changes
+
+
+def _sourcing(root, path):
+    # The loaded file of the tree, its source and the sub-filename sourcing the absolute ``path``.
+    from .interface_file import _absolute_filename
+
+    for f in _loaded_files(root):
+        if f._sub_files is None:
+            continue
+        for source in f.sources:
+            if isinstance(source, Source):
+                if _absolute_filename(source.source_filename, source, f) == path:
+                    return f, source, source.source_filename
+            elif isinstance(source, SourceDirectory):
+                dirname = os.path.abspath(os.path.join(f.absolute_dirname, source.source_directory))
+                if dirname == os.path.dirname(path):
+                    return f, source, os.path.join(source.source_directory, os.path.basename(path))
+
+
+def _create_file(files, root, filename):
+    # A sub-file that is not loaded yet, sourced by one of the files of the tree.
+    from .interface_file import InterfacesFile
+
+    found = _sourcing(root, os.path.join(root.absolute_dirname, filename))
+    if found is None:
+        raise PatchError('No file of the tree sources %s' % filename)
+    parent, source, sub_filename = found
+    sub_file = InterfacesFile(sub_filename, source=source, parent=parent, _records=[])
+    parent._sub_files.append(sub_file)
+    root._tree.includes.setdefault(parent.absolute_filename, []).append(sub_file.absolute_filename)
+    files[filename] = sub_file
+    return sub_file
+
+
+def _attached(f):
+    return f.parent is None or f.source in f.parent.sources
+
+
+def _move(root, f):
+    # Moves a sub-file whose source was removed under the new source of its path, if any.
+    found = _sourcing(root, f.absolute_filename)
+    if found is None:
+        return False
+    parent, source, sub_filename = found
+    f.parent._sub_files.remove(f)
+    parent._sub_files.append(f)
+    f.parent = parent
+    f.source = source
+    f.filename = sub_filename
+    f.dirname = os.path.dirname(sub_filename)
+    f.dirty = True
+    return True
+
+
+def _find(f, change):
+    key = list(change.key)
+    if key[0] in ('source', 'source-directory'):
+        candidates = f.sources
+    else:
+        candidates = [s for s in f._tree.index.get(key[1], ()) if s._owner is f]
+    for stanza in candidates:
+        if stanza_key(stanza) == key:
+            return stanza
+    raise PatchError('%s: no %s' % (f.filename, ' '.join(key)))
+
+
+def _set_startup(f, stanza, mode):
+    if not mode:
+        stanza.startup = None
+    else:
+        stanza.startup = Stanza.type_for(mode)(f.filename, mode, stanza.name)
+
+
+def _remove(f, stanza):
+    if isinstance(stanza, IfaceBase):
+        f.remove_iface(stanza)
+        return
+
+    # Its sub-files are moved or dropped once the whole patch is applied.
+    f.sources.remove(stanza)
+    stanza._owner = None
+    f._stanza_removed(stanza)
+
+
+def _apply_change(f, change):
+    if change.op == REMOVE:
+        _remove(f, _find(f, change))
+
+    elif change.op == ADD:
+        stanza = Stanza.type_for(change.headers[0])(f.filename, *change.headers)
+        for cells in change.options:
+            stanza._add_cells(list(cells))
+        if isinstance(stanza, IfaceBase):
+            if change.startup:
+                _set_startup(f, stanza, change.startup)
+            f.add_iface(stanza)
+        else:
+            stanza._owner = f
+            f.sources.append(stanza)
+            f._stanza_added(stanza)
+
+    elif change.op == CHANGE:
+        stanza = _find(f, change)
+        if change.headers is not None:
+            stanza._headers = list(change.headers)
+            stanza._changed()
+        if change.startup is not None:
+            _set_startup(f, stanza, change.startup)
+        for key, values in (change.options or {}).items():
+            stanza._set_all(key, values)
+
+    else:
+        raise PatchError('Unknown operation %s' % change.op)
+
+
+def apply(interfaces_file, patch):
+    """Applies a patch made by :func:`diff` to the tree of ``interfaces_file``, in place.
+
+    The stanzas are edited, added or removed through the tree, so the name index, the dirty flags and
+    the hashes are kept up to date and only the modified files are written by the next save. A file
+    missing from the tree is created, empty, when one of the files sources it. A file whose source is
+    removed moves under the new source of its path, if any, and is dropped otherwise, ignoring the
+    changes to its stanzas.
+
+    Raises :class:`~network_interfaces.errors.PatchError` when a stanza or file to change is missing.
+    """
+    root = interfaces_file.root
+    files = dict(_files(root))
+    for change in patch:
+        change = Change(*change)
+        if change.filename not in files:
+            if change.op == REMOVE:
+                continue
+            if change.op == CHANGE:
+                raise PatchError('No file %s in the tree' % change.filename)
+            _create_file(files, root, change.filename)
+
+        f = files[change.filename]
+        if not _attached(f) and not _move(root, f):
+            # Dropped with its source.
+            continue
+        _apply_change(f, change)
+
+    for f in list(_loaded_files(root)):
+        if not _attached(f) and not _move(root, f):
+            f.parent._sub_files.remove(f)
+            f._detach()
+
+    # In the order of a load.
+    for f in _loaded_files(root):
+        if f._sub_files:
+            positions = {id(source): i for i, source in enumerate(f.sources)}
+            f._sub_files.sort(key=lambda x: (positions[id(x.source)], x.filename))
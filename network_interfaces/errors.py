@@ -4,4 +4,47 @@ __author__ = 'vahid'
 
 
 class ValidationError(Exception):
-    pass
\ No newline at end of file
+    """Carries every :class:`~network_interfaces.validation.Error` found, in ``errors``, or a plain
+    message with no ``errors``."""
+
+    def __init__(self, errors=()):
+        if isinstance(errors, str):
+            self.errors = []
+            message = errors
+        else:
+            self.errors = list(errors)
+            message = '\n'.join('%s: %s: %s' % (e.filename, e.name, e.message) for e in self.errors)
+        super(ValidationError, self).__init__(message)
+
+
+class PatchError(Exception):
+    pass
+
+
+class DependencyCycleError(Exception):
+    """Carries the dependency ``cycles``, lists of interface names, that prevent an ordering."""
+
+    def __init__(self, cycles=()):
+        self.cycles = list(cycles)
+        super(DependencyCycleError, self).__init__(
+            'dependency cycles: %s' % '; '.join(', '.join(cycle) for cycle in self.cycles))
+
+
+class IncludeCycleError(Exception):
+    """Carries the ``cycle`` of absolute filenames, each one sourcing the next, back to the first."""
+
+    def __init__(self, cycle=()):
+        self.cycle = list(cycle)
+        super(IncludeCycleError, self).__init__('include cycle: %s' % ' -> '.join(self.cycle))
+
+
+class RollbackError(Exception):
+    """A failed commit whose rollback failed too. Carries the ``(filename, rollback_filename, error)``
+    of each file that could not be restored, in ``failures``: its original content is kept in
+    ``rollback_filename``."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        super(RollbackError, self).__init__('cannot restore: %s' % ', '.join(
+            '%s from %s: %s' % (filename, rollback_filename, error)
+            for filename, rollback_filename, error in self.failures))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+__author__ = 'vahid'
+
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+
+class ChangeEvent(namedtuple('ChangeEvent', ['kind', 'name', 'filename', 'stanza'])):
+    """An interface or mapping ``stanza`` was added, removed or modified in the file ``filename``."""
+    __slots__ = ()
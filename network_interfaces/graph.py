@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Dependency graph of the interfaces of a tree, for ordering their bring-up.
+
+An interface depends on the ones that must be up before it: the slaves of a bond, from its
+``bond-slaves`` or their ``bond-master``, the ports of a bridge, the raw device of a VLAN, from its
+``vlan-raw-device`` or its ``eth0.100`` name, and the logical interfaces a mapping maps to. The
+relations of each stanza are extracted once and the graph is kept current by the notifications of the
+tree, only a changed stanza is read again. The order and the waves are cached until an edge changes.
+"""
+import heapq
+from collections import namedtuple
+
+from .errors import DependencyCycleError
+from .iface import Mapping
+__author__ = 'vahid'
+
+
+BOND = 'bond'
+BRIDGE = 'bridge'
+VLAN = 'vlan'
+MAP = 'map'
+
+# ``name`` depends on ``dependency``, ``kind`` is one of the constants above.
+Edge = namedtuple('Edge', ['name', 'dependency', 'kind'])
+
+# Values of the port lists that are not interface names.
+_KEYWORDS = frozenset(('none', 'all', 'regex', 'noregex', 'glob'))
+
+
+def _values(stanza, key):
+    return [v for cells in stanza._entries(key) for v in cells[1:] if v not in _KEYWORDS]
+
+
+def relations(stanza):
+    """The set of :class:`Edge` given by the options and the name of an interface or mapping."""
+    name = stanza.name
+    if isinstance(stanza, Mapping):
+        return {Edge(name, cells[-1], MAP) for cells in stanza._entries('map') if len(cells) > 2}
+
+    result = set()
+    base, _, vid = name.rpartition('.')
+    if base and vid.isdigit():
+        result.add(Edge(name, base, VLAN))
+    result.update(Edge(name, device, VLAN) for device in _values(stanza, 'vlan-raw-device'))
+    result.update(Edge(name, slave, BOND) for slave in _values(stanza, 'bond-slaves'))
+    result.update(Edge(master, name, BOND) for master in _values(stanza, 'bond-master'))
+    for key in ('bridge_ports', 'bridge-ports'):
+        result.update(Edge(name, port, BRIDGE) for port in _values(stanza, key))
+    return result
+
+
+class DependencyGraph(object):
+    """The dependencies between the interfaces of the whole tree of ``interfaces_file``, its lazy
+    sub-files are loaded. The interfaces only named by a relation, like the physical slaves of a bond
+    without a stanza, are nodes too.
+
+    The graph observes the tree until :meth:`close` is called.
+    """
+
+    def __init__(self, interfaces_file):
+        self.root = interfaces_file.root
+        self._tree = self.root._tree
+        self._tree.observers.append(self)
+        self.builds = 0
+        self.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self in self._tree.observers:
+            self._tree.observers.remove(self)
+
+    def clear(self):
+        # id -> (stanza, name, edges) of the stanzas of the tree.
+        self._stanzas = {}
+        # Name -> the number of stanzas of that name.
+        self._declared = {}
+        # Edge -> the number of stanzas giving it, and the adjacency built from them.
+        self._edges = {}
+        self._dependencies = {}
+        self._dependents = {}
+        self._built = False
+        self._invalidate()
+
+    def _invalidate(self):
+        self._order = None
+        self._waves = None
+        self._cycles = None
+
+    def _build(self):
+        if self._built:
+            return
+        stanzas = [s for f in self.root.iter_files() for s in f.interfaces + f.mappings]
+        self._built = True
+        for stanza in stanzas:
+            self.added(stanza)
+        self.builds += 1
+
+    def _link(self, edge):
+        count = self._edges.get(edge, 0)
+        self._edges[edge] = count + 1
+        if not count:
+            self._dependencies.setdefault(edge.name, set()).add(edge.dependency)
+            self._dependents.setdefault(edge.dependency, set()).add(edge.name)
+            self._invalidate()
+
+    def _unlink(self, edge):
+        count = self._edges.pop(edge) - 1
+        if count:
+            self._edges[edge] = count
+            return
+        # Another kind of relation may link the same interfaces.
+        if any(Edge(edge.name, edge.dependency, kind) in self._edges for kind in (BOND, BRIDGE, VLAN, MAP)):
+            return
+        self._dependencies[edge.name].discard(edge.dependency)
+        self._dependents[edge.dependency].discard(edge.name)
+        self._invalidate()
+
+    def added(self, stanza):
+        if not self._built:
+            return
+        edges = relations(stanza)
+        self._stanzas[id(stanza)] = (stanza, stanza.name, edges)
+        if not self._declared.get(stanza.name):
+            self._invalidate()
+        self._declared[stanza.name] = self._declared.get(stanza.name, 0) + 1
+        for edge in edges:
+            self._link(edge)
+
+    def removed(self, stanza, name):
+        entry = self._stanzas.pop(id(stanza), None)
+        if entry is None:
+            return
+        _, name, edges = entry
+        for edge in edges:
+            self._unlink(edge)
+        self._declared[name] -= 1
+        if not self._declared[name]:
+            del self._declared[name]
+            self._invalidate()
+
+    def changed(self, stanza):
+        entry = self._stanzas.get(id(stanza))
+        if entry is None:
+            return
+        edges = relations(stanza)
+        if edges == entry[2]:
+            return
+        for edge in edges - entry[2]:
+            self._link(edge)
+        for edge in entry[2] - edges:
+            self._unlink(edge)
+        self._stanzas[id(stanza)] = (stanza, entry[1], edges)
+
+    @property
+    def nodes(self):
+        """The sorted names of the interfaces of the graph."""
+        self._build()
+        names = set(self._declared)
+        for edge in self._edges:
+            names.add(edge.name)
+            names.add(edge.dependency)
+        return sorted(names)
+
+    def edges(self):
+        """The sorted list of :class:`Edge`."""
+        self._build()
+        return sorted(self._edges)
+
+    def _closure(self, adjacency, name):
+        seen = set()
+        stack = [name]
+        while stack:
+            for other in adjacency.get(stack.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        seen.discard(name)
+        return seen
+
+    def dependencies(self, name, recursive=False):
+        """The sorted names of the interfaces ``name`` depends on, transitively if ``recursive``."""
+        self._build()
+        if recursive:
+            return sorted(self._closure(self._dependencies, name))
+        return sorted(self._dependencies.get(name, ()))
+
+    def dependents(self, name, recursive=False):
+        """The sorted names of the interfaces depending on ``name``, transitively if ``recursive``."""
+        self._build()
+        if recursive:
+            return sorted(self._closure(self._dependents, name))
+        return sorted(self._dependents.get(name, ()))
+
+    def cycles(self):
+        """The dependency cycles, as sorted lists of names, found with Tarjan's algorithm."""
+        self._build()
+        if self._cycles is None:
+            self._cycles = self._strongly_connected()
+        return [list(c) for c in self._cycles]
+
+    def _strongly_connected(self):
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        result = []
+        for start in self.nodes:
+            if start in index:
+                continue
+            # Iterative DFS, each frame is a node and the iterator over its dependencies.
+            work = [(start, iter(sorted(self._dependencies.get(start, ()))))]
+            index[start] = low[start] = len(index)
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                node, dependencies = work[-1]
+                for dependency in dependencies:
+                    if dependency not in index:
+                        index[dependency] = low[dependency] = len(index)
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(sorted(self._dependencies.get(dependency, ())))))
+                        break
+                    if dependency in on_stack:
+                        low[node] = min(low[node], index[dependency])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            other = stack.pop()
+                            on_stack.discard(other)
+                            component.append(other)
+                            if other == node:
+                                break
+                        if len(component) > 1 or node in self._dependencies.get(node, ()):
+                            result.append(sorted(component))
+        return sorted(result)
+
+    def waves(self):
+        """The interfaces grouped in waves that can be brought up concurrently, each one depending
+        only on the previous ones. Raises :class:`~network_interfaces.errors.DependencyCycleError`."""
+        self._build()
+        if self._waves is None:
+            cycles = self.cycles()
+            if cycles:
+                raise DependencyCycleError(cycles)
+            remaining = {name: len(self._dependencies.get(name, ())) for name in self.nodes}
+            wave = sorted(name for name, count in remaining.items() if not count)
+            waves = []
+            while wave:
+                waves.append(wave)
+                ready = []
+                for name in wave:
+                    for dependent in self._dependents.get(name, ()):
+                        remaining[dependent] -= 1
+                        if not remaining[dependent]:
+                            ready.append(dependent)
+                wave = sorted(ready)
+            self._waves = waves
+        return [list(w) for w in self._waves]
+
+    def order(self):
+        """A bring-up order of every interface, after its dependencies, the ties sorted by name.
+        Raises :class:`~network_interfaces.errors.DependencyCycleError`."""
+        self._build()
+        if self._order is None:
+            cycles = self.cycles()
+            if cycles:
+                raise DependencyCycleError(cycles)
+            remaining = {name: len(self._dependencies.get(name, ())) for name in self.nodes}
+            heap = [name for name, count in remaining.items() if not count]
+            heapq.heapify(heap)
+            order = []
+            while heap:
+                name = heapq.heappop(heap)
+                order.append(name)
+                for dependent in self._dependents.get(name, ()):
+                    remaining[dependent] -= 1
+                    if not remaining[dependent]:
+                        heapq.heappush(heap, dependent)
+            self._order = order
+        return list(self._order)
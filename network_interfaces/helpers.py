@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os.path
 __author__ = 'vahid'
 
 
@@ -6,5 +7,19 @@ def clean_list(l):
     return [j for j in [i.strip().strip('"') for i in l] if j]
 
 
+def split_cells(line):
+    cells = line.split()
+    if '"' in line:
+        cells = [j for j in [i.strip('"') for i in cells] if j]
+    return cells
+
+
 def list_hash(l):
     return hash(tuple(l))
+
+
+def rooted(path, rootdir):
+    """``path`` under ``rootdir``, when there is one and ``path`` is absolute."""
+    if rootdir and os.path.isabs(path):
+        return os.path.join(rootdir, os.path.relpath(path, os.sep))
+    return path
@@ -1,11 +1,35 @@
 # -*- coding: utf-8 -*-
 from .stanza import MultilineStanza
-from .errors import ValidationError
+from .validation import check_iface, check_mapping
 __author__ = 'vahid'
 
 
 class IfaceBase(MultilineStanza):
-    startup = None
+    __slots__ = ('_startup',)
+
+    def __init__(self, *args, **kwargs):
+        super(IfaceBase, self).__init__(*args, **kwargs)
+        self._startup = None
+
+    def _copy(self, filename):
+        other = super(IfaceBase, self)._copy(filename)
+        object.__setattr__(other, '_startup', None)
+        return other
+
+    @property
+    def startup(self):
+        return self._startup
+
+    @startup.setter
+    def startup(self, val):
+        if val is None and self._startup is not None:
+            # Unbound, a lossless file drops its line.
+            self._startup._text = None
+        text = self._text
+        self._startup = val
+        self._changed()
+        # The startup stanza is rendered on its own.
+        self._text = text
 
     @property
     def name(self):
@@ -13,10 +37,19 @@ class IfaceBase(MultilineStanza):
 
     @name.setter
     def name(self, val):
+        old = self._headers[1]
         self._headers[1] = val
+        if self._owner is not None and old != val:
+            self._owner._rename_iface(self, old)
+        self._changed()
 
-    def __hash__(self):
-        return hash(self.startup) ^ super(IfaceBase, self).__hash__()
+    def _compute_hash(self):
+        return hash(self.startup) ^ super(IfaceBase, self)._compute_hash()
+
+    def _canonical_lines(self):
+        if self.startup:
+            yield ' '.join(self.startup._headers)
+        yield from super(IfaceBase, self)._canonical_lines()
 
     def __repr__(self):
         if self.startup:
@@ -25,6 +58,7 @@ class IfaceBase(MultilineStanza):
 
 
 class Iface(IfaceBase):
+    __slots__ = ()
     _type = 'iface'
 
     @property
@@ -34,6 +68,7 @@ class Iface(IfaceBase):
     @address_family.setter
     def address_family(self, val):
         self._headers[2] = val
+        self._changed()
 
     @property
     def method(self):
@@ -42,30 +77,30 @@ class Iface(IfaceBase):
     @method.setter
     def method(self, val):
         self._headers[3] = val
+        self._changed()
 
     @property
     def address_netmask(self):
         return '%s/%s' % (self.address, self.netmask)
 
-    def validate(self, allow_correction=False):
-
-        # Returning true for now.
-        # FIXME: implement validation
-        # if not (hasattr(self, 'network')):
-        #     raise ValidationError()
-        return True
+    def _check(self, allow_correction=False, strict=False):
+        return check_iface(self, allow_correction, strict)
 
 
 class Mapping(IfaceBase):
+    __slots__ = ()
     _type = 'mapping'
 
+    def _check(self, allow_correction=False, strict=False):
+        return check_mapping(self, allow_correction)
+
     def __getattr__(self, item):
         if item.startswith('map_'):
             map_name = item.split('_')[1]
             key = map_name.replace('_', '-')
-            return ' '.join([i for i in self._items if i[0] == 'map' and i[1] == key][0][2:])
+            return ' '.join([i for i in self._entries('map') if i[1] == key][0][2:])
         return super(Mapping, self).__getattr__(item)
 
     @property
     def mappings(self):
-        return [i for i in self._items if i[0] == 'map']
+        return self._entries('map')
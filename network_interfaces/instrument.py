@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+__author__ = 'vahid'
+
+
+class Instrumentation(object):
+    """Counters and timers of the parse and save hot paths.
+
+    Pass an instance as ``InterfacesFile(..., instrument=instrumentation)``, it's shared by the whole
+    tree. Without one, the instrumented code only pays for an ``is not None`` check.
+
+    Counters: ``files_opened``, ``bytes_read``, ``lines_read``, ``stanzas_parsed``, ``glob_calls``,
+    ``listdir_calls``, ``lookups``, ``cache_hits``, ``cache_misses``, ``files_written``,
+    ``bytes_written``. ``listdir_calls`` counts the sourced directories actually scanned, the listings
+    reused by the :class:`~network_interfaces.scan.DirectoryScanner` are not.
+
+    Timers, in seconds: ``read``, ``tokenize``, ``materialize``, ``bind_startups``, ``render`` and
+    ``write``.
+
+    Every hook added with :meth:`add_hook` is called as ``hook(kind, name, value)``, ``kind`` being
+    ``'count'`` or ``'time'``, on each update, to export the data to a metrics system.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+        for hook in self._hooks:
+            hook('count', name, value)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.timers[name] += seconds
+        for hook in self._hooks:
+            hook('time', name, seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {'counters': dict(self.counters), 'timers': dict(self.timers)}
@@ -1,185 +1,864 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import glob
-import re
+import hashlib
 import os.path
-import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from .constants import DEFAULT_HEADER
-from .stanza import Stanza
+from .helpers import rooted
+from .storage import commit
+from .cache import ParseCache
+from .parser import read_records, read_layout, expand, is_glob
 from .source import SourceDirectory, Source
+from .scan import DirectoryScanner
 from .startup import StartupStanza
 from .iface import Iface, Mapping
+from .events import ChangeEvent, ADDED, REMOVED, MODIFIED
+from .errors import ValidationError, IncludeCycleError
+from .serializer import serialize, serialize_layout
+from .query import Indexes, DEFAULT_INDEXES
 __author__ = 'vahid'
 
 
+def _absolute_filename(filename, source, parent=None):
+    if filename.startswith('/'):
+        # The absolute sourced files are under the root directory of the tree.
+        return rooted(filename, parent._tree.rootdir) if parent is not None else filename
+
+    # Sourced files are relative to the directory of the including file.
+    if parent is not None:
+        return os.path.abspath(os.path.join(parent.absolute_dirname, filename))
+
+    if source:
+        rootdir = os.path.dirname(source._filename)
+        return os.path.abspath(os.path.join(rootdir, filename))
+
+    raise ValueError('Cannot resolve absolute path for %s' % filename)
+
+
+class _Tree(object):
+    """State shared by every file of an interfaces tree."""
+
+    def __init__(self, cache=None, lazy=False, executor=None, instrument=None, render_cache=True,
+                 lossless=False, indexes=DEFAULT_INDEXES, rootdir=None):
+        self.cache = cache
+        self.lazy = lazy
+        self.executor = executor
+        self.instrument = instrument
+        self.render_cache = render_cache
+        self.lossless = lossless
+        self.rootdir = rootdir
+        self.scanner = cache.scanner if cache is not None else DirectoryScanner()
+        # Name -> stanzas index, in lookup order.
+        self.index = {}
+        # Secondary indexes, built by the first query using them.
+        self.indexes = Indexes(self, indexes)
+        # Notified of the interfaces and mappings added to, removed from and changed in the tree, and
+        # cleared when the tree is reindexed.
+        self.observers = [self.indexes]
+        # Include graph: absolute filename -> its loaded file, and -> the absolute filenames it sources.
+        self.files = {}
+        self.includes = {}
+        # Number of files whose sub-files are not loaded yet.
+        self.pending = 0
+        # Absolute filename -> records read ahead of the load, by :meth:`InterfacesFile.aload`.
+        self.prefetched = None
+
+    def added(self, stanza):
+        for observer in self.observers:
+            observer.added(stanza)
+
+    def removed(self, stanza, name):
+        for observer in self.observers:
+            observer.removed(stanza, name)
+
+    def changed(self, stanza):
+        for observer in self.observers:
+            observer.changed(stanza)
+
+    def clear(self):
+        for observer in self.observers:
+            observer.clear()
+
+    def include_chain(self, start, target):
+        """The absolute filenames from ``start`` to ``target``, each one sourcing the next, or ``None``
+        when ``start`` does not source ``target``, even indirectly."""
+        previous = {start: None}
+        queue = [start]
+        for path in queue:
+            if path == target:
+                chain = []
+                while path is not None:
+                    chain.append(path)
+                    path = previous[path]
+                return chain[::-1]
+            for included in self.includes.get(path, ()):
+                if included not in previous:
+                    previous[included] = path
+                    queue.append(included)
+
+
+def _sub_paths(records, filename, scanner, ignore, layout=False, rootdir=None, instrument=None):
+    # The absolute filenames sourced by the records of ``filename``.
+    dirname = os.path.dirname(filename)
+    paths = []
+    if layout:
+        records = [record for record, _ in records if record is not None]
+    for record in records:
+        if record[0][0] in ('source', 'source-directory'):
+            for source in expand(record, filename, dirname, instrument, scanner, ignore, rootdir):
+                paths += [os.path.abspath(os.path.join(dirname, rooted(f, rootdir)))
+                          for f in source.sub_filenames(dirname, scanner, ignore, rootdir, instrument)]
+    return paths
+
+
 class InterfacesFile(object):
 
     @property
     def absolute_filename(self):
-        if self.filename.startswith('/'):
-            return self.filename
+        return _absolute_filename(self.filename, self.source, self.parent)
 
-        if self.source:
-            rootdir = os.path.dirname(self.source._filename)
-            return os.path.abspath(os.path.join(rootdir, self.filename))
+    @property
+    def absolute_dirname(self):
+        return os.path.dirname(self.absolute_filename)
 
-        raise ValueError('Cannot resolve absolute path for %s' % self.filename)
+    @property
+    def root(self):
+        f = self
+        while f.parent is not None:
+            f = f.parent
+        return f
 
-    def __init__(self, filename, header=DEFAULT_HEADER, backup='.back', source=None):
+    @property
+    def sub_files(self):
+        """The files sourced by this file that were not loaded already, through another ``source``
+        of the tree: every file is parsed once and belongs to its first includer."""
+        if self._sub_files is None:
+            self._load_sub_files()
+        return self._sub_files
+
+    @property
+    def includes(self):
+        """Every file sourced by this file, in order, the ones shared with other includers too."""
+        self.sub_files
+        files = self._tree.files
+        return [files[p] for p in self._tree.includes.get(self.absolute_filename, ()) if p in files]
+
+    def __init__(self, filename, header=DEFAULT_HEADER, backup='.back', source=None, parent=None, cache=None,
+                 lazy=False, executor=None, instrument=None, render_cache=True, lossless=False,
+                 indexes=DEFAULT_INDEXES, rootdir=None, _records=None, _prefetched=None):
+        """Parses ``filename`` and, unless ``lazy``, every file it sources. A lazy tree parses the sub-files
+        on the first access to :attr:`sub_files` or the first lookup that needs them.
+
+        With an ``executor`` from :mod:`concurrent.futures`, the sibling sub-files of each file are read
+        and tokenized concurrently, the resulting tree is the same as with a serial load. A process pool
+        does not use the ``cache``.
+
+        ``instrument`` takes an :class:`~network_interfaces.instrument.Instrumentation` to collect the
+        counters and timings of the whole tree.
+
+        With ``render_cache`` the rendered text of each stanza is kept until it changes, so rendering and
+        saving a mostly unchanged tree again only joins strings.
+
+        A ``lossless`` tree keeps the comments, blank lines and formatting of its files: only the changed
+        lines of the edited stanzas are rendered again, the new stanzas are appended and the ``header`` is
+        not added. It does not use the ``cache``.
+
+        ``indexes`` are the fields indexed for :meth:`query`: ``name``, ``address_family``, ``method``,
+        ``startup`` or option keys, like ``vlan-raw-device``.
+
+        The absolute paths of the ``source`` and ``source-directory`` stanzas are read under ``rootdir``,
+        if any, like the copy of the root filesystem of another host.
+        """
         self.source = source
+        self.parent = parent
+        if parent is not None:
+            self._tree = parent._tree
+        else:
+            self._tree = _Tree(cache, lazy, executor, instrument, render_cache, lossless, indexes, rootdir)
+            self._tree.prefetched = _prefetched
+        self.cache = self._tree.cache
         self.filename = filename
         self.dirname = os.path.dirname(filename)
-        self.sub_files = []
+        self._sub_files = None
         self.header = header
         self.backup = backup
-        current_stanza = None
-        stanzas = []
-
-        with open(self.absolute_filename) as f:
-            for l in f:
-                line = l.strip()
-                if not line or line.startswith('#'):
+        # Whether stanzas were modified since the last save, and the state of the file at that time.
+        self.dirty = True
+        self._synced = None
+        # Memoized (value, stanza count) pairs.
+        self._hash = None
+        self._digest = None
+
+        path = self.absolute_filename
+        self._tree.files[path] = self
+        records = _records if _records is not None else self._read_records(path)
+        self._pending_startups = self._load(records)
+        self._tree.pending += 1
+        if self._tree.lazy:
+            self._claim_startups()
+        else:
+            self._load_sub_files()
+        if parent is None:
+            self._tree.prefetched = None
+
+    @classmethod
+    async def aload(cls, filename, max_concurrency=16, executor=None, **kwargs):
+        """Asynchronous counterpart of the constructor, taking the same keyword arguments.
+
+        The files of the tree are read and tokenized in ``executor``, the loop's default one if ``None``,
+        at most ``max_concurrency`` at a time, the sibling sub-files concurrently. The tree is then built
+        off the loop too, from the records read, so it is the same as the one of the blocking API. A lazy
+        tree only reads the root file ahead.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        cache = kwargs.get('cache')
+        instrument = kwargs.get('instrument')
+        lazy = kwargs.get('lazy', False)
+        lossless = kwargs.get('lossless', False)
+        if lossless:
+            read = partial(read_layout, instrument=instrument)
+        elif cache is not None:
+            read = partial(cache.read_records, instrument=instrument)
+        else:
+            read = partial(read_records, instrument=instrument)
+        list_sub_paths = partial(_sub_paths, scanner=cache.scanner if cache is not None else DirectoryScanner(),
+                                 ignore=(kwargs.get('backup', '.back'),), layout=lossless,
+                                 rootdir=kwargs.get('rootdir'), instrument=instrument)
+
+        prefetched = {}
+
+        async def fetch(path):
+            if path in prefetched:
+                return
+            prefetched[path] = None
+            async with semaphore:
+                records = await loop.run_in_executor(executor, read, path)
+                sub_paths = [] if lazy else await loop.run_in_executor(executor, list_sub_paths, records, path)
+            prefetched[path] = records
+            await asyncio.gather(*(fetch(p) for p in sub_paths))
+
+        await fetch(_absolute_filename(filename, kwargs.get('source')))
+        return await loop.run_in_executor(executor, partial(cls, filename, _prefetched=prefetched, **kwargs))
+
+    async def asave(self, executor=None, **kwargs):
+        """Asynchronous counterpart of :meth:`save`, taking the same keyword arguments. The files are
+        compared, rendered and committed in ``executor``, the loop's default one if ``None``."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(self.save, **kwargs))
+
+    def _load(self, records):
+        self.interfaces, self.mappings, self.sources, self._startups, self._layout = self._parse(records)
+
+        tree = self._tree
+        for iface in self.interfaces + self.mappings:
+            tree.index.setdefault(iface.name, []).append(iface)
+            tree.added(iface)
+
+        return list(self._startups)
+
+    def _parse(self, records):
+        instrument = self._tree.instrument
+        if instrument is None:
+            return self._materialize(records, None)
+
+        instrument.count('stanzas_parsed', len(records))
+        with instrument.timer('materialize'):
+            return self._materialize(records, instrument)
+
+    def _materialize(self, records, instrument):
+        interfaces = []
+        mappings = []
+        sources = []
+        startups = []
+        # Lossless trees: the text between the stanzas, and a (text, stanzas, texts) entry per record.
+        layout = [] if self._tree.lossless else None
+        dirname = self.absolute_dirname
+        # The stanzas of a parse cache entry are copied, a new entry gets copies of the parsed ones.
+        cache = self._tree.cache
+        prototypes = parsed = None
+        if layout is None and isinstance(cache, ParseCache):
+            prototypes = cache.prototypes(self.absolute_filename, records)
+            if prototypes is None:
+                parsed = []
+
+        for i, record in enumerate(records):
+            if layout is not None:
+                record, text = record
+                if record is None:
+                    layout.append(text)
                     continue
-                if Stanza.is_stanza(line):
-                    if current_stanza:
-                        stanzas.append(current_stanza)
-                    cells = re.split('\s+', line)
-                    if cells[0] == 'source' and cells[1].endswith('/*'):
-                        list_files = glob.glob(os.path.join(self.dirname, cells[1]))
-                        for file in list_files:
-                            if file.endswith('.back'):
-                                continue
-                            file = f'source {file}'
-                            file = file.replace(f'{self.dirname}/', '')
-                            s = Stanza.create(file, self.filename)
-                            stanzas.append(s)
-                            current_stanza = None
-                    else:
-                        current_stanza = Stanza.create(line, self.filename)
-                else:
-                    current_stanza.add_entry(line)
-            if current_stanza:
-                stanzas.append(current_stanza)
-
-        self.interfaces = [iface for iface in stanzas if isinstance(iface, Iface)]
-        for i in self.interfaces:
-            stanzas.remove(i)
 
-        self.mappings = [mapping for mapping in stanzas if isinstance(mapping, Mapping)]
-        for i in self.mappings:
-            stanzas.remove(i)
+            prototype = prototypes[i] if prototypes is not None else None
+            if prototype is not None:
+                stanzas = [prototype._copy(self.filename)]
+            else:
+                stanzas = expand(record, self.filename, dirname, instrument, self._tree.scanner, (self.backup,),
+                                 self._tree.rootdir)
+                if parsed is not None:
+                    parsed.append(None if is_glob(record[0]) else stanzas[0]._copy(self.filename))
+            if layout is not None:
+                # The text of a stanza is cleared when it changes, marking it for rendering.
+                for stanza in stanzas:
+                    stanza._text = text if len(stanzas) == 1 else stanza._render()
+                layout.append((text, stanzas, tuple(stanza._text for stanza in stanzas)))
+
+            for stanza in stanzas:
+                stanza._owner = self
+                if isinstance(stanza, Iface):
+                    interfaces.append(stanza)
+                elif isinstance(stanza, Mapping):
+                    mappings.append(stanza)
+                elif isinstance(stanza, (Source, SourceDirectory)):
+                    sources.append(stanza)
+                elif isinstance(stanza, StartupStanza):
+                    startups.append(stanza)
+
+        if parsed is not None:
+            cache.store_prototypes(self.absolute_filename, records, parsed)
+        return interfaces, mappings, sources, startups, layout
+
+    def _sub_filenames(self, source):
+        return source.sub_filenames(self.absolute_dirname, self._tree.scanner, (self.backup,), self._tree.rootdir,
+                                    self._tree.instrument)
+
+    def _read_records(self, filename):
+        prefetched = self._tree.prefetched
+        if prefetched and prefetched.get(filename) is not None:
+            return prefetched[filename]
+        if self._tree.lossless:
+            return read_layout(filename, self._tree.instrument)
+        if self.cache is not None:
+            return self.cache.read_records(filename, self._tree.instrument)
+        return read_records(filename, self._tree.instrument)
+
+    def _prefetch(self, subfiles):
+        executor = self._tree.executor
+        if isinstance(executor, ProcessPoolExecutor):
+            read = read_layout if self._tree.lossless else read_records
+        elif self._tree.lossless:
+            read = partial(read_layout, instrument=self._tree.instrument)
+        elif self.cache is None:
+            read = partial(read_records, instrument=self._tree.instrument)
+        else:
+            read = partial(self.cache.read_records, instrument=self._tree.instrument)
+
+        futures = [executor.submit(read, _absolute_filename(f, s, self)) for f, s in subfiles]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _include(self, path):
+        # Records the sources of this file in the include graph, returns the filenames to load, the
+        # other ones are loaded already.
+        tree = self._tree
+        includes = tree.includes[path] = []
+        subfiles = []
+        for source in self.sources:
+            for sub_filename in self._sub_filenames(source):
+                sub_path = _absolute_filename(sub_filename, source, self)
+                if sub_path in includes:
+                    continue
+                includes.append(sub_path)
+                if sub_path not in tree.files:
+                    subfiles.append((sub_filename, source))
+                    continue
 
-        self.sources = [source for source in stanzas if isinstance(source, (Source, SourceDirectory))]
+                chain = tree.include_chain(sub_path, path)
+                if chain is not None:
+                    raise IncludeCycleError(chain + [sub_path])
+        return subfiles
+
+    def _load_sub_files(self):
+        subfiles = self._include(self.absolute_filename)
+        if self._tree.executor is not None and not self._tree.prefetched and len(subfiles) > 1:
+            records = self._prefetch(subfiles)
+        else:
+            records = [None] * len(subfiles)
+
+        self._sub_files = []
+        for (sub_filename, source), sub_records in zip(subfiles, records):
+            if _absolute_filename(sub_filename, source, self) in self._tree.files:
+                # Sourced by a previous sub-file too, it was loaded there.
+                continue
+            self._sub_files.append(InterfacesFile(sub_filename, source=source, parent=self, _records=sub_records))
 
-        subfiles = []
-        for i in self.sources:
-            if isinstance(i, SourceDirectory):
-                d = i.source_directory
-                subfiles += [(os.path.join(d, f), i) for f in os.listdir(os.path.join(self.dirname, d))
-                             if os.path.isfile(os.path.join(self.dirname, d, f)) and
-                             re.match('^[a-zA-Z0-9_-]+$', f)]
+        self._tree.pending -= 1
+        if not self._tree.lazy:
+            instrument = self._tree.instrument
+            if instrument is None:
+                self._bind_startups(self._pending_startups)
             else:
-                subfiles.append((i.source_filename, i))
+                with instrument.timer('bind_startups'):
+                    self._bind_startups(self._pending_startups)
+            self._pending_startups = []
 
-        for subfile in subfiles:
-            self.sub_files.append(InterfacesFile(subfile[0], source=subfile[1]))
-
-        for startup in [s for s in stanzas if isinstance(s, StartupStanza)]:
+    def _bind_startups(self, startups):
+        for startup in startups:
             try:
                 self.get_iface(startup.iface_name).startup = startup
             except KeyError:
                 continue
 
+    def _local_iface(self, name):
+        for iface in self._tree.index.get(name, ()):
+            if iface._owner is self:
+                return iface
+
+    def _claim_startups(self):
+        # Lazy trees bind each startup stanza as soon as the file defining its interface is loaded.
+        f = self
+        while f is not None:
+            if f._pending_startups:
+                pending = []
+                for startup in f._pending_startups:
+                    iface = self._local_iface(startup.iface_name)
+                    if iface is None:
+                        pending.append(startup)
+                    else:
+                        iface.startup = startup
+                f._pending_startups = pending
+            f = f.parent
+
+    @staticmethod
+    def _stanza_key(stanza):
+        if isinstance(stanza, Iface):
+            return stanza._type, stanza.name, stanza.address_family
+        return stanza._type, stanza.name
+
+    def reload(self, rescan=False):
+        """Re-reads this file and patches the tree in place, without parsing the other files again.
+
+        Unchanged stanzas are kept, modified ones are updated in place so the references held on them
+        stay valid. The sub-files are synchronized when the sources changed, or always with ``rescan``,
+        for when the content of a sourced directory changed: the new ones are loaded and the removed
+        ones are dropped with their interfaces. Returns the list of
+        :class:`~network_interfaces.events.ChangeEvent`.
+        """
+        records = self._read_records(self.absolute_filename)
+        interfaces, mappings, sources, startups, layout = self._parse(records)
+        events = []
+        replaced = {}
+
+        startup_modes = self._unbind_startups()
+
+        previous = {}
+        for stanza in self.interfaces + self.mappings:
+            previous.setdefault(self._stanza_key(stanza), []).append(stanza)
+
+        kept = []
+        for new_collection in (interfaces, mappings):
+            result = []
+            for stanza in new_collection:
+                candidates = previous.get(self._stanza_key(stanza))
+                if not candidates:
+                    self._stanza_added(stanza)
+                    events.append(ChangeEvent(ADDED, stanza.name, self.filename, stanza))
+                    result.append(stanza)
+                    continue
+
+                existing = candidates.pop(0)
+                if existing._headers != stanza._headers or existing._items != stanza._items:
+                    existing._replace_content(stanza)
+                    events.append(ChangeEvent(MODIFIED, existing.name, self.filename, existing))
+                if layout is not None:
+                    existing._text = stanza._text
+                    replaced[id(stanza)] = existing
+                result.append(existing)
+            kept.append(result)
+        self.interfaces, self.mappings = kept
+
+        for candidates in previous.values():
+            for stanza in candidates:
+                self._unindex(stanza, stanza.name)
+                stanza._owner = None
+                self._stanza_removed(stanza)
+                events.append(ChangeEvent(REMOVED, stanza.name, self.filename, stanza))
+
+        sources_changed = [s._headers for s in self.sources] != [s._headers for s in sources]
+        self.sources = sources
+        self._startups = startups
+        if layout is not None:
+            layout = [e if isinstance(e, str) else (e[0], [replaced.get(id(s), s) for s in e[1]], e[2])
+                      for e in layout]
+        self._layout = layout
+        if self._sub_files is not None and (rescan or sources_changed):
+            events += self._sync_sub_files()
+        if any(e.kind == ADDED for e in events):
+            self.root._reindex()
+
+        self._rebind_startups()
+        reported = set(id(e.stanza) for e in events)
+        for iface, mode in startup_modes:
+            current = iface.startup.mode if iface.startup else None
+            if iface._owner is not None and current != mode and id(iface) not in reported:
+                events.append(ChangeEvent(MODIFIED, iface.name, iface._owner.filename, iface))
+
+        self._hash = None
+        self._digest = None
+        self._synced = None
+        self.dirty = True
+        return events
+
+    def _reindex(self):
+        # Rebuilds the name index of the loaded files, in lookup order.
+        index = self._tree.index
+        index.clear()
+        self._tree.clear()
+        stack = [self]
+        while stack:
+            f = stack.pop()
+            for iface in f.interfaces + f.mappings:
+                index.setdefault(iface.name, []).append(iface)
+            if f._sub_files is not None:
+                stack.extend(reversed(f._sub_files))
+
+    def _unbind_startups(self):
+        # Returns the interfaces bound to the startup stanzas of this file, and their modes.
+        result = []
+        for startup in self._startups:
+            for iface in self._tree.index.get(startup.iface_name, ()):
+                if iface.startup is startup:
+                    iface.startup = None
+                    result.append((iface, startup.mode))
+        return result
+
+    def _rebind_startups(self):
+        # The startup stanzas of this file, and the ones of the including files that may now find
+        # their interface in a new sub-file.
+        f = self
+        while f is not None:
+            unbound = [s for s in f._startups
+                       if not any(i.startup is s for i in f._tree.index.get(s.iface_name, ()))]
+            if f._sub_files is None:
+                f._pending_startups = unbound
+                f._claim_startups()
+            else:
+                f._bind_startups(unbound)
+            f = f.parent
+
+    def _sync_sub_files(self):
+        events = []
+        previous = {f.absolute_filename: f for f in self._sub_files}
+        for sub_file in previous.values():
+            self._tree.files.pop(sub_file.absolute_filename, None)
+        result = []
+        for sub_filename, source in self._include(self.absolute_filename):
+            existing = previous.pop(_absolute_filename(sub_filename, source, self), None)
+            if existing is not None:
+                self._tree.files[existing.absolute_filename] = existing
+                existing.source = source
+                result.append(existing)
+                continue
+            if _absolute_filename(sub_filename, source, self) in self._tree.files:
+                continue
+
+            sub_file = InterfacesFile(sub_filename, source=source, parent=self)
+            result.append(sub_file)
+            for f in sub_file.iter_files():
+                events += [ChangeEvent(ADDED, i.name, f.filename, i) for i in f.interfaces + f.mappings]
+
+        for sub_file in previous.values():
+            events += sub_file._detach()
+        self._sub_files = result
+        return events
+
+    def _detach(self):
+        events = []
+        path = self.absolute_filename
+        if self._tree.files.get(path) is self:
+            del self._tree.files[path]
+        self._tree.includes.pop(path, None)
+        if self._sub_files is None:
+            self._tree.pending -= 1
+        else:
+            for sub_file in self._sub_files:
+                events += sub_file._detach()
+        for iface in self.interfaces + self.mappings:
+            self._unindex(iface, iface.name)
+            iface._owner = None
+            events.append(ChangeEvent(REMOVED, iface.name, self.filename, iface))
+        return events
+
+    def iter_files(self):
+        """Yields this file and all of its sub-files, depth first."""
+        yield self
+        for sub_file in self.sub_files:
+            yield from sub_file.iter_files()
+
     def find_iface(self, name):
-        return [iface for iface in self.interfaces if iface.name.index(name)]
+        """Returns the interfaces of this file and its sub-files whose name contains ``name``."""
+        return [i for i in self.query(name='*%s*' % glob.escape(name)) if isinstance(i, Iface)]
+
+    def query(self, name=None, **criteria):
+        """Yields the interfaces and mappings of this file and its sub-files matching every criterion.
+
+        ``name`` is a name or a glob pattern, like ``eth*``. The criteria are ``address_family``,
+        ``method``, ``startup``, the mode of the startup stanza, or option keys, with underscores for the
+        dashes, like ``vlan_raw_device='bond0'``. A value is compared as is, ``None`` matching a missing
+        one, or is a predicate called with the value. The stanzas come in the order of the index used,
+        the order of the tree when none is, and a lazy tree is loaded entirely.
+
+        ``f.query(address_family='inet', method='static', startup='auto')``
+        """
+        return self._tree.indexes.query(self, name, criteria.items())
 
     def add_iface(self, iface):
 
-        if iface.name in [x.name for x in self.interfaces + self.mappings]:
+        if any(x._owner is self for x in self._tree.index.get(iface.name, ())):
             raise KeyError("interface definition already exists")
 
         if isinstance(iface, Iface):
             self.interfaces.append(iface)
         elif isinstance(iface, Mapping):
             self.mappings.append(iface)
+        else:
+            return
+
+        iface._owner = self
+        self._index(iface)
+        self._tree.added(iface)
+        self._stanza_added(iface)
+
+    def remove_iface(self, iface):
+        if isinstance(iface, str):
+            iface = self.get_iface(iface)
+
+        if iface._owner is not self:
+            if iface._owner is None or iface._owner.root is not self.root:
+                raise KeyError(iface.name)
+            return iface._owner.remove_iface(iface)
+
+        collection = self.interfaces if isinstance(iface, Iface) else self.mappings
+        collection.remove(iface)
+        if iface.startup is not None:
+            # Drops the startup line of a lossless file too.
+            iface.startup._text = None
+        self._unindex(iface, iface.name)
+        iface._owner = None
+        self._stanza_removed(iface)
+        return iface
 
     def get_iface(self, name):
-        result = [iface for iface in self.interfaces + self.mappings if iface.name == name]
-        if result:
-            return result[0]
+        if self._tree.instrument is not None:
+            self._tree.instrument.count('lookups')
 
-        for s in self.sub_files:
-            try:
-                return s.get_iface(name)
-            except KeyError:
-                continue
+        if self._tree.pending:
+            result = self._lookup(name)
+            if result is not None:
+                return result
+            raise KeyError(name)
+
+        for iface in self._tree.index.get(name, ()):
+            if self.parent is None or self._owns(iface):
+                return iface
 
         raise KeyError(name)
 
-    def as_string(self, validate=True, allow_correction=True):
-        content = list()
+    def _lookup(self, name):
+        # Depth first search, loading the sub-files on the way.
+        result = self._local_iface(name)
+        if result is not None:
+            return result
+
+        for sub_file in self.sub_files:
+            result = sub_file._lookup(name)
+            if result is not None:
+                return result
+
+    def __contains__(self, name):
+        try:
+            self.get_iface(name)
+        except KeyError:
+            return False
+        return True
+
+    def _owns(self, stanza):
+        f = stanza._owner
+        while f is not None:
+            if f is self:
+                return True
+            f = f.parent
+        return False
+
+    def _unindex(self, iface, name):
+        entries = self._tree.index.get(name)
+        if not entries:
+            return
+        for i, x in enumerate(entries):
+            if x is iface:
+                del entries[i]
+                break
+        if not entries:
+            del self._tree.index[name]
+        self._tree.removed(iface, name)
+
+    def _index(self, iface):
+        # Inserts in lookup order, after the stanzas of this file and of the files looked up before it.
+        entries = self._tree.index.setdefault(iface.name, [])
+        position = self._position()
+        i = len(entries)
+        while i and entries[i - 1]._owner._position() > position:
+            i -= 1
+        entries.insert(i, iface)
+
+    def _position(self):
+        # The sub-file indices from the root, ordering the files as a depth first search does.
+        path = []
+        f = self
+        while f.parent is not None:
+            path.append(next(i for i, x in enumerate(f.parent._sub_files) if x is f))
+            f = f.parent
+        path.reverse()
+        return path
+
+    def _rename_iface(self, iface, old_name):
+        self._unindex(iface, old_name)
+        self._index(iface)
+        self._tree.added(iface)
 
+    def as_string(self, validate=True, allow_correction=True):
         if validate:
             self.validate(allow_correction=allow_correction)
 
-        content.append(self.header)
-        for iface in self.interfaces:
-            content.append('\n')
-            content.append(repr(iface))
-
-        for mapping in self.mappings:
-            content.append('\n')
-            content.append(repr(mapping))
-
-        for source in self.sources:
-            content.append('\n')
-            content.append(repr(source))
+        instrument = self._tree.instrument
+        if instrument is None:
+            return self._render()
+        with instrument.timer('render'):
+            return self._render()
+
+    def _render(self):
+        if self._layout is not None:
+            return serialize_layout(self)
+        return serialize(self, self._tree.render_cache)
+
+    def validate(self, allow_correction=False, recursive=False, strict=False):
+        """Validates every stanza, of the sub-files too if ``recursive``, and raises a single
+        :class:`~network_interfaces.errors.ValidationError` with all the errors found. ``strict`` rejects
+        the addressing options of the other methods too, :meth:`as_string` and :meth:`save` don't."""
+        errors = []
+        for f in self.iter_files() if recursive else [self]:
+            for stanza in f._stanzas():
+                errors += stanza._check(allow_correction, strict)
+        if errors:
+            raise ValidationError(errors)
+        return True
+
+    def _signature(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        stanzas = tuple(id(s) for s in self.interfaces + self.mappings + self.sources)
+        return filename, st.st_mtime_ns, st.st_size, st.st_ino, self.header, stanzas
+
+    def _stanza_changed(self, stanza, old_hash=None):
+        self._tree.changed(stanza)
+        self.dirty = True
+        self._digest = None
+        if self._hash is not None:
+            if old_hash is None:
+                self._hash = None
+            else:
+                self._hash = (self._hash[0] ^ old_hash ^ hash(stanza), self._hash[1])
 
-        return ''.join(content)
+    def _stanza_added(self, stanza):
+        self.dirty = True
+        self._digest = None
+        if self._hash is not None:
+            self._hash = (self._hash[0] ^ hash(stanza), self._hash[1] + 1)
 
-    def validate(self, allow_correction=False):
-        for stanza_collection in (self.interfaces, self.mappings, self.sources):
-            for stanza in stanza_collection:
-                stanza.validate(allow_correction=allow_correction)
+    def _stanza_removed(self, stanza):
+        self.dirty = True
+        self._digest = None
+        if self._hash is not None:
+            self._hash = (self._hash[0] ^ hash(stanza), self._hash[1] - 1)
 
     def save(self, recursive=False, filename=None, directory=None, validate=True, allow_correction=True):
-
+        """Writes the file, and its sub-files if ``recursive``, skipping the ones whose content on disk
+        is already up to date. All the files are replaced atomically, as a single transaction. Returns
+        the list of the filenames that were actually written.
+        """
         if validate:
-            self.validate(allow_correction=allow_correction)
-
-        filename = filename if filename else self.filename
+            self.validate(allow_correction=allow_correction, recursive=recursive)
+
+        writes = []
+        synced = []
+        self._plan_save(writes, synced, recursive, filename, directory)
+
+        instrument = self._tree.instrument
+        if instrument is None:
+            commit(writes)
+        else:
+            with instrument.timer('write'):
+                commit(writes)
+            instrument.count('files_written', len(writes))
+            instrument.count('bytes_written', sum(len(w[1]) for w in writes))
+
+        for f, target in synced:
+            f.dirty = False
+            f._synced = f._signature(target)
+
+        return [w[0] for w in writes]
+
+    def _plan_save(self, writes, synced, recursive, filename, directory):
+        if not filename:
+            filename = self.filename
+            if self.parent is not None:
+                # Written where it was read, an absolute sourced file under the root directory.
+                filename = rooted(filename, self._tree.rootdir)
         if not filename.startswith('/') and directory:
             filename = os.path.abspath(os.path.join(directory, filename))
 
-        if self.backup and os.path.exists(filename):
-            shutil.copyfile(filename, '%s%s' % (filename, self.backup))
-
-        with open(filename, 'w') as f:
-            f.write(self.header)
-            for iface in self.interfaces:
-                f.write('\n')
-                f.write(repr(iface))
-
-            for mapping in self.mappings:
-                f.write('\n')
-                f.write(repr(mapping))
+        if self.dirty or self._synced is None or self._synced != self._signature(filename):
+            content = self.as_string(validate=False)
+            try:
+                with open(filename) as f:
+                    unchanged = f.read() == content
+            except OSError:
+                unchanged = False
 
-            for source in self.sources:
-                f.write('\n')
-                f.write(repr(source))
+            if not unchanged:
+                writes.append((filename, content, self.backup))
+            synced.append((self, filename))
 
         if recursive:
-            dirname = directory if directory else os.path.abspath(os.path.dirname(filename))
+            dirname = os.path.abspath(os.path.dirname(filename))
             for sub_file in self.sub_files:
-                sub_file.save(recursive=recursive, directory=dirname)
-
-    def __hash__(self):
-        result = 0
-        for iface in self.interfaces:
-            result ^= hash(iface)
+                sub_file._plan_save(writes, synced, recursive, None, dirname)
 
-        for map in self.mappings:
-            result ^= hash(map)
+    def _stanzas(self):
+        return self.interfaces + self.mappings + self.sources
 
-        for source in self.sources:
-            result ^= hash(source)
-        return result
+    def __hash__(self):
+        # Kept up to date incrementally by the stanza notifications, the count catches the direct
+        # manipulations of the stanza lists.
+        count = len(self.interfaces) + len(self.mappings) + len(self.sources)
+        if self._hash is None or self._hash[1] != count:
+            result = 0
+            for stanza in self._stanzas():
+                result ^= hash(stanza)
+            self._hash = (result, count)
+        return self._hash[0]
+
+    def digest(self, recursive=False):
+        """SHA-256 of the stanzas in their rendering order, and of the sub-files too if ``recursive``.
+        Unlike ``hash()`` it is comparable across processes and hosts.
+        """
+        stanzas = self._stanzas()
+        if self._digest is None or self._digest[1] != len(stanzas):
+            self._digest = (hashlib.sha256(b''.join(s.digest() for s in stanzas)).digest(), len(stanzas))
+
+        if not recursive:
+            return self._digest[0]
+
+        h = hashlib.sha256(self._digest[0])
+        for sub_file in self.sub_files:
+            h.update(sub_file.filename.encode())
+            h.update(sub_file.digest(recursive=True))
+        return h.digest()
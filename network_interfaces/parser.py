@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+from sys import intern
+import mmap
+import os.path
+import re
+
+from .helpers import split_cells
+from .stanza import Stanza, MultilineStanza
+# Imported for their side effect of registering the stanza types.
+from . import iface, source, startup  # noqa: F401
+from .source import Source, SourceDirectory
+from .scan import DirectoryScanner
+from .errors import IncludeCycleError
+__author__ = 'vahid'
+
+
+# Resolved once at import time, every stanza class is registered by now.
+STANZA_TYPES = dict(Stanza._types)
+_PREFIXES = tuple(p for p, _ in Stanza._prefix_types)
+stanza_type = Stanza.type_for
+
+# The content of the lines that are neither blank nor comments.
+_CONTENT_LINE = re.compile(rb'^[ \t\f\v]*([^#\s].*)', re.MULTILINE)
+_CHUNK = 1 << 20
+# Bounds of the cache of the decoded lines of :func:`tokenize_bytes`: the length of a cached line and
+# the number of lines.
+_CACHED_LINE = 64
+_CACHED_LINES = 1 << 15
+
+
+def tokenize(lines, filename=None):
+    """Yields a ``(header_cells, option_cells)`` record per stanza, in a single pass over ``lines``."""
+    header = None
+    items = None
+    types = STANZA_TYPES
+    for lineno, line in enumerate(lines, 1):
+        cells = line.split()
+        if not cells or cells[0][0] == '#':
+            continue
+
+        if '"' in line:
+            cells = split_cells(line)
+            if not cells:
+                continue
+
+        # Keys and most of the values (methods, masks, parent devices, ...) repeat a lot.
+        cells = list(map(intern, cells))
+
+        keyword = cells[0]
+        if keyword in types or (keyword.startswith(_PREFIXES) and stanza_type(keyword)):
+            if header is not None:
+                yield header, items
+            header = cells
+            items = []
+        elif header is None:
+            raise ValueError('%s:%d: option outside of a stanza: %s' % (filename, lineno, line.strip()))
+        else:
+            items.append(cells)
+
+    if header is not None:
+        yield header, items
+
+
+def tokenize_bytes(data, filename=None):
+    """Like :func:`tokenize`, over the raw bytes of a file, ``bytes`` or an ``mmap``.
+
+    The blank and comment lines are skipped by the regex engine without being copied, only the content
+    lines are. The short lines, like the repeated keywords and options of generated files, are decoded
+    and split once, their repetitions share the same cells list, which must not be modified. The cache
+    is bounded, so its memory does not grow with the file.
+    """
+    header = None
+    items = None
+    types = STANZA_TYPES
+    # Raw short line -> cells.
+    lines = {}
+    for match in _CONTENT_LINE.finditer(data):
+        line = match.group(1)
+        cells = lines.get(line)
+        if cells is None:
+            text = line.decode()
+            cells = list(map(intern, split_cells(text) if '"' in text else text.split()))
+            if len(line) <= _CACHED_LINE and len(lines) < _CACHED_LINES:
+                lines[line] = cells
+        if not cells:
+            continue
+
+        keyword = cells[0]
+        if keyword in types or (keyword.startswith(_PREFIXES) and stanza_type(keyword)):
+            if header is not None:
+                yield header, items
+            header = cells
+            items = []
+        elif header is None:
+            lineno = data[:match.start()].count(b'\n') + 1
+            raise ValueError('%s:%d: option outside of a stanza: %s' % (filename, lineno, line.decode().strip()))
+        else:
+            items.append(cells)
+
+    if header is not None:
+        yield header, items
+
+
+def tokenize_layout(lines, filename=None):
+    """Like :func:`tokenize`, but yields ``(record, text)`` pairs keeping the exact text of ``lines``.
+
+    ``text`` is the source of the record, from its header to its last option, comments and blank lines
+    in between included. The comments and blank lines between the stanzas are yielded as
+    ``(None, text)``. ``lines`` must keep their line endings.
+    """
+    header = None
+    items = None
+    raw = None
+    trivia = []
+    types = STANZA_TYPES
+    for lineno, line in enumerate(lines, 1):
+        cells = line.split()
+        if not cells or cells[0][0] == '#':
+            trivia.append(line)
+            continue
+
+        if '"' in line:
+            cells = split_cells(line)
+            if not cells:
+                trivia.append(line)
+                continue
+
+        cells = list(map(intern, cells))
+
+        keyword = cells[0]
+        if keyword in types or (keyword.startswith(_PREFIXES) and stanza_type(keyword)):
+            if header is not None:
+                yield (header, items), ''.join(raw)
+            if trivia:
+                yield None, ''.join(trivia)
+                trivia = []
+            header = cells
+            items = []
+            raw = [line]
+        elif header is None:
+            raise ValueError('%s:%d: option outside of a stanza: %s' % (filename, lineno, line.strip()))
+        else:
+            items.append(cells)
+            raw += trivia
+            raw.append(line)
+            trivia = []
+
+    if header is not None:
+        yield (header, items), ''.join(raw)
+    if trivia:
+        yield None, ''.join(trivia)
+
+
+def read_layout(filename, instrument=None):
+    if instrument is not None:
+        instrument.count('files_opened')
+    with open(filename, newline='') as f:
+        content = f.read()
+    if instrument is None:
+        return list(tokenize_layout(content.splitlines(True), filename))
+
+    lines = content.splitlines(True)
+    instrument.count('bytes_read', len(content))
+    instrument.count('lines_read', len(lines))
+    with instrument.timer('tokenize'):
+        return list(tokenize_layout(lines, filename))
+
+
+def _map(f):
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Empty files and the ones that are not regular can't be mapped.
+        return f.read()
+
+
+def read_records(filename, instrument=None):
+    """Tokenizes ``filename`` from a memory map of it, see :func:`tokenize_bytes`."""
+    if instrument is None:
+        with open(filename, 'rb') as f:
+            data = _map(f)
+    else:
+        instrument.count('files_opened')
+        with instrument.timer('read'):
+            with open(filename, 'rb') as f:
+                data = _map(f)
+    try:
+        return tokenize_data(data, filename, instrument)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def tokenize_data(data, filename, instrument=None):
+    """The records of the raw bytes ``data``, with the counters of ``instrument``."""
+    if instrument is None:
+        return list(tokenize_bytes(data, filename))
+
+    instrument.count('bytes_read', len(data))
+    instrument.count('lines_read', sum(data[i:i + _CHUNK].count(b'\n') for i in range(0, len(data), _CHUNK)) +
+                     (1 if data and data[-1:] != b'\n' else 0))
+    with instrument.timer('tokenize'):
+        return list(tokenize_bytes(data, filename))
+
+
+def tokenize_content(content, filename, instrument=None):
+    if instrument is None:
+        return list(tokenize(content.splitlines(), filename))
+
+    lines = content.splitlines()
+    instrument.count('bytes_read', len(content))
+    instrument.count('lines_read', len(lines))
+    with instrument.timer('tokenize'):
+        return list(tokenize(lines, filename))
+
+
+def materialize(record, filename):
+    header, items = record
+    cls = stanza_type(header[0])
+    stanza = cls(filename, *header)
+    if items:
+        if not isinstance(stanza, MultilineStanza):
+            raise ValueError('%s: %s does not accept options' % (filename, ' '.join(header)))
+        for cells in items:
+            stanza._add_cells(list(cells))
+    return stanza
+
+
+def is_glob(header):
+    """Whether the stanza of ``header`` is a ``source dir/*``, expanded from the listing of ``dir``."""
+    return header[0] == 'source' and len(header) > 1 and header[1].endswith('/*')
+
+
+def expand(record, filename, dirname, instrument=None, scanner=None, ignore=(), rootdir=None):
+    """Materializes a record, expanding ``source dir/*`` into a :class:`Source` per matching file.
+
+    ``scanner`` is the :class:`~network_interfaces.scan.DirectoryScanner` listing the directory,
+    ``ignore`` the extra suffixes of the files to skip and ``rootdir`` the directory the absolute
+    patterns are matched under.
+    """
+    header = record[0]
+    if is_glob(header):
+        if instrument is not None:
+            instrument.count('glob_calls')
+        return Source.expand_glob(header[1], dirname, filename, scanner, ignore, rootdir, instrument)
+    return [materialize(record, filename)]
+
+
+def parse(lines, filename=None):
+    for record in tokenize(lines, filename):
+        yield materialize(record, filename)
+
+
+def iter_stanzas(filename, follow_sources=False, _scanner=None, _seen=None, _stack=()):
+    """Lazily yields the stanzas of ``filename`` while it is being read.
+
+    With ``follow_sources`` the stanzas of the sourced files are yielded right after their
+    :class:`Source` or :class:`SourceDirectory` stanza, recursively. A file sourced more than once is
+    only read the first time, and a file sourcing itself, even indirectly, raises
+    :class:`~network_interfaces.errors.IncludeCycleError`. Only the current record of each open file is
+    held in memory.
+    """
+    path = os.path.abspath(filename)
+    if path in _stack:
+        raise IncludeCycleError(_stack[_stack.index(path):] + (path,))
+    seen = _seen if _seen is not None else set()
+    if path in seen:
+        return
+    seen.add(path)
+
+    dirname = os.path.dirname(filename)
+    scanner = _scanner if _scanner is not None else DirectoryScanner()
+    with open(filename) as f:
+        for record in tokenize(f, filename):
+            for stanza in expand(record, filename, dirname, scanner=scanner):
+                yield stanza
+                if follow_sources and isinstance(stanza, (Source, SourceDirectory)):
+                    for sub_filename in stanza.sub_filenames(dirname, scanner):
+                        yield from iter_stanzas(os.path.join(dirname, sub_filename), follow_sources, scanner,
+                                                seen, _stack + (path,))
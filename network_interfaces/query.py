@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Secondary indexes and attribute queries over the interfaces and mappings of a tree.
+
+An index maps each value of a field to the stanzas having it, in the order they were indexed. It is
+built on the first query using its field and kept current afterwards by the notifications of the
+files: stanzas added, removed or changed. The ``name`` index is the sorted list of the names of the
+tree, so the glob patterns starting with a literal prefix, like ``eth*``, only visit the names with
+that prefix.
+"""
+import bisect
+import fnmatch
+import re
+
+from .iface import Iface
+__author__ = 'vahid'
+
+
+ATTRIBUTES = frozenset(('name', 'address_family', 'method', 'startup'))
+DEFAULT_INDEXES = ('name', 'address_family', 'method', 'startup')
+_MAGIC = re.compile(r'[*?[]')
+
+
+def field(key):
+    """The field of a criterion, the attributes as is and the option keys with dashes."""
+    return key if key in ATTRIBUTES else key.replace('_', '-')
+
+
+def field_value(stanza, key):
+    """The value of the ``key`` field of ``stanza``, ``None`` when it has none."""
+    if key == 'name':
+        return stanza.name
+    if key == 'startup':
+        return stanza.startup.mode if stanza.startup is not None else None
+    if key in ATTRIBUTES:
+        return getattr(stanza, key) if isinstance(stanza, Iface) else None
+    cells = stanza._keys.get(key)
+    return ' '.join(cells[1:]) if cells else None
+
+
+def _matches(stanza, criteria):
+    for key, expected in criteria:
+        value = field_value(stanza, key)
+        if not (expected(value) if callable(expected) else value == expected):
+            return False
+    return True
+
+
+class Indexes(object):
+    """The secondary indexes of a tree, on the ``fields`` given to
+    :class:`~network_interfaces.InterfacesFile`."""
+
+    def __init__(self, tree, fields=DEFAULT_INDEXES):
+        self.tree = tree
+        self.fields = frozenset(field(f) for f in fields)
+        self.builds = 0
+        # Field -> value -> {id: stanza}, for the fields built so far.
+        self._buckets = {}
+        # id -> (stanza, {field: value}), the values the stanza is indexed under.
+        self._filed = {}
+        # The sorted distinct names, None until built.
+        self._names = None
+
+    def clear(self):
+        """Drops the indexes, they are built again by the next query."""
+        self._buckets = {}
+        self._filed = {}
+        self._names = None
+
+    def _file(self, stanza, key, value):
+        self._buckets[key].setdefault(value, {})[id(stanza)] = stanza
+        self._filed.setdefault(id(stanza), (stanza, {}))[1][key] = value
+
+    def _unfile(self, stanza, key, value):
+        bucket = self._buckets[key].get(value)
+        if bucket is not None:
+            bucket.pop(id(stanza), None)
+            if not bucket:
+                del self._buckets[key][value]
+
+    def added(self, stanza):
+        for key in self._buckets:
+            self._file(stanza, key, field_value(stanza, key))
+        if self._names is not None:
+            i = bisect.bisect_left(self._names, stanza.name)
+            if i == len(self._names) or self._names[i] != stanza.name:
+                self._names.insert(i, stanza.name)
+
+    def removed(self, stanza, name):
+        entry = self._filed.pop(id(stanza), None)
+        if entry is not None:
+            for key, value in entry[1].items():
+                self._unfile(stanza, key, value)
+        if self._names is not None and name not in self.tree.index:
+            i = bisect.bisect_left(self._names, name)
+            if i < len(self._names) and self._names[i] == name:
+                del self._names[i]
+
+    def changed(self, stanza):
+        entry = self._filed.get(id(stanza))
+        if entry is None:
+            return
+        for key, value in list(entry[1].items()):
+            new_value = field_value(stanza, key)
+            if new_value != value:
+                self._unfile(stanza, key, value)
+                self._file(stanza, key, new_value)
+
+    def _stanzas(self, root):
+        # Loads the lazy sub-files first, their loads notify the indexes built so far.
+        files = list(root.iter_files())
+        return [s for f in files for s in f.interfaces + f.mappings]
+
+    def _bucket(self, root, key, value):
+        if key not in self._buckets:
+            stanzas = self._stanzas(root)
+            self._buckets[key] = {}
+            for stanza in stanzas:
+                self._file(stanza, key, field_value(stanza, key))
+            self.builds += 1
+        return self._buckets[key].get(value, {})
+
+    def names(self, root, pattern):
+        """The names of the tree matching the glob ``pattern``, sorted."""
+        if self._names is None:
+            self._stanzas(root)
+            self._names = sorted(self.tree.index)
+            self.builds += 1
+        magic = _MAGIC.search(pattern)
+        prefix = pattern[:magic.start()] if magic else pattern
+        result = []
+        for i in range(bisect.bisect_left(self._names, prefix), len(self._names)):
+            name = self._names[i]
+            if not name.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(name, pattern):
+                result.append(name)
+        return result
+
+    def _candidates(self, root, name, criteria):
+        # The smallest set of stanzas given by an index, None when no criterion is indexed.
+        if self.tree.pending:
+            self._stanzas(root)
+
+        sets = []
+        if name is not None and not _MAGIC.search(name):
+            sets.append(self.tree.index.get(name, ()))
+        elif name is not None and 'name' in self.fields:
+            sets.append([s for n in self.names(root, name) for s in self.tree.index[n]])
+        for key, expected in criteria:
+            if key in self.fields and (expected is None or isinstance(expected, str)):
+                sets.append(self._bucket(root, key, expected).values())
+        if not sets:
+            return None
+        return list(min(sets, key=len))
+
+    def query(self, f, name=None, criteria=()):
+        """Yields the stanzas of ``f`` and its sub-files matching ``name`` and every criterion."""
+        root = f.root
+        criteria = [(field(k), v) for k, v in criteria]
+        stanzas = self._candidates(root, name, criteria)
+        if stanzas is None:
+            stanzas = [s for sub_file in f.iter_files() for s in sub_file.interfaces + sub_file.mappings]
+        elif f is not root:
+            stanzas = [s for s in stanzas if f._owns(s)]
+
+        if name is not None:
+            criteria.insert(0, ('name', name if not _MAGIC.search(name)
+                                else lambda value: fnmatch.fnmatchcase(value, name)))
+        for stanza in stanzas:
+            if stanza._owner is not None and _matches(stanza, criteria):
+                yield stanza
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+import glob
+import os
+import re
+import threading
+
+from .helpers import rooted
+from .storage import ROLLBACK_SUFFIX
+__author__ = 'vahid'
+
+
+# The backups, and the rollback copies of a commit in progress or of a failed one.
+IGNORED_SUFFIXES = ('.back', ROLLBACK_SUFFIX)
+_MAGIC = re.compile(r'[*?[]')
+
+
+class DirectoryScanner(object):
+    """Lists the regular files of the sourced directories with :func:`os.scandir`.
+
+    The listing of a directory is kept until its ``mtime`` changes, so rescanning an unchanged directory
+    costs a single ``stat``. Names ending with one of the ``ignore`` suffixes, backups by default, are
+    never returned.
+    """
+
+    def __init__(self, ignore=IGNORED_SUFFIXES):
+        self.ignore = tuple(ignore)
+        self.scans = 0
+        self._listings = {}
+        self._patterns = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+    def listings(self):
+        """The ``{dirname: ((mtime_ns, inode), names)}`` listings kept, to persist them."""
+        with self._lock:
+            return dict(self._listings)
+
+    def update(self, listings):
+        """Adds listings returned by :meth:`listings`, they are used while their directory is unchanged."""
+        with self._lock:
+            self._listings.update(listings)
+
+    def _files(self, dirname, instrument=None):
+        st = os.stat(dirname)
+        key = (st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            entry = self._listings.get(dirname)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        with os.scandir(dirname) as entries:
+            files = sorted(e.name for e in entries if e.is_file())
+        with self._lock:
+            self._listings[dirname] = (key, files)
+            self.scans += 1
+        if instrument is not None:
+            instrument.count('listdir_calls')
+        return files
+
+    def _compile(self, pattern):
+        regex = self._patterns.get(pattern)
+        if regex is None:
+            regex = self._patterns[pattern] = re.compile(fnmatch.translate(pattern))
+        return regex
+
+    def files(self, dirname, pattern=None, ignore=(), instrument=None):
+        """The sorted names of the regular files of ``dirname`` matching the ``pattern`` regex, if any.
+        A scan of the directory is counted in the ``listdir_calls`` of ``instrument``."""
+        ignore = self.ignore + tuple(s for s in ignore if s)
+        match = pattern.match if pattern is not None else None
+        return [name for name in self._files(dirname or '.', instrument)
+                if not name.endswith(ignore) and (match is None or match(name))]
+
+    def glob(self, pattern, dirname, ignore=(), rootdir=None, instrument=None):
+        """The sorted files matching the shell ``pattern``, relative to ``dirname`` as the pattern is. An
+        absolute ``pattern`` is matched under ``rootdir``, if any, but the files are not prefixed by it."""
+        pattern_dirname, basename = os.path.split(pattern)
+        if _MAGIC.search(pattern_dirname):
+            ignore = self.ignore + tuple(s for s in ignore if s)
+            paths = [p for p in glob.glob(os.path.join(dirname, rooted(pattern, rootdir)))
+                     if os.path.isfile(p) and not p.endswith(ignore)]
+            if not os.path.isabs(pattern):
+                return sorted(os.path.relpath(p, dirname) for p in paths)
+            if rootdir:
+                paths = [os.path.join(os.sep, os.path.relpath(p, rootdir)) for p in paths]
+            return sorted(paths)
+
+        regex = self._compile(basename)
+        try:
+            names = self.files(os.path.join(dirname, rooted(pattern_dirname, rootdir)), regex, ignore, instrument)
+        except FileNotFoundError:
+            return []
+        # Like the shell, wildcards do not match the hidden files.
+        if not basename.startswith('.'):
+            names = [n for n in names if not n.startswith('.')]
+        return [os.path.join(pattern_dirname, n) for n in names]
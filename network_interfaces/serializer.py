@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from difflib import SequenceMatcher
+
+from .helpers import split_cells
+from .stanza import MultilineStanza
+from .startup import StartupStanza
+__author__ = 'vahid'
+
+
+def render_stanza(stanza, cache=True):
+    """The text of ``stanza``, kept on it with ``cache`` until the stanza changes."""
+    if not cache:
+        return stanza._render()
+    text = stanza._text
+    if text is None:
+        text = stanza._text = stanza._render()
+    return text
+
+
+def serialize(interfaces_file, cache=True):
+    """Renders ``interfaces_file`` in a single buffer: the header, then the interfaces with their startup
+    stanzas, the mappings and the sources. This is the text written by ``save``."""
+    parts = [interfaces_file.header]
+    append = parts.append
+    for collection in (interfaces_file.interfaces, interfaces_file.mappings):
+        for iface in collection:
+            append('\n')
+            startup = iface.startup
+            if startup:
+                append(render_stanza(startup, cache))
+                append('\n')
+            append(render_stanza(iface, cache))
+
+    for source in interfaces_file.sources:
+        append('\n')
+        append(render_stanza(source, cache))
+    return ''.join(parts)
+
+
+def _new_startup(stanza):
+    # The startup stanzas read from a file have their own place in its layout, not the new ones.
+    startup = getattr(stanza, 'startup', None)
+    if startup and startup._owner is None:
+        return startup
+
+
+def _line_cells(line):
+    # The cells of a line of the text of a stanza, None for its comments and blank lines.
+    cells = line.split()
+    if not cells or cells[0][0] == '#':
+        return None
+    if '"' in line:
+        return split_cells(line) or None
+    return cells
+
+
+def _option_line(cells, indent, newline):
+    value = ' '.join(cells[1:]).strip()
+    if value:
+        return '%s%s %s%s' % (indent, cells[0], value, newline)
+
+
+def _merge_lines(stanza, text):
+    """The ``text`` of ``stanza`` read from its file, with only its changed lines rendered again: the
+    comments, blank lines and formatting of the others are kept."""
+    lines = text.splitlines(True)
+    stripped = lines[0].rstrip('\r\n')
+    newline = lines[0][len(stripped):] or '\n'
+    # The index in ``lines`` of each original option.
+    options = [i for i, line in enumerate(lines) if i and _line_cells(line) is not None]
+    old = [tuple(_line_cells(lines[i])) for i in options]
+    new = [tuple(cells) for cells in stanza._items]
+    indent = '  '
+    if options:
+        line = lines[options[0]]
+        indent = line[:len(line) - len(line.lstrip())]
+
+    # Original option index -> the lines replacing it, the inserted ones go before it. The options
+    # without a value are not rendered, their line is None.
+    replaced = {}
+    inserted = {}
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            continue
+        rendered = [_option_line(cells, indent, newline) for cells in new[j1:j2]]
+        if tag == 'insert':
+            inserted.setdefault(i1, []).extend(rendered)
+            continue
+        # Line by line, the extra new lines go with the last old one.
+        for i in range(i1, i2):
+            replaced[i] = rendered[i - i1:i - i1 + 1]
+        replaced[i2 - 1] = rendered[i2 - 1 - i1:]
+
+    result = []
+    if _line_cells(lines[0]) == stanza._headers:
+        result.append(lines[0])
+    else:
+        result.append(' '.join(stanza._headers) + newline)
+    position = {index: i for i, index in enumerate(options)}
+    for index, line in enumerate(lines[1:], 1):
+        i = position.get(index)
+        if i is None:
+            result.append(line)
+            continue
+        result += filter(None, inserted.get(i, ()))
+        result += filter(None, replaced.get(i, [line]))
+    tail = [line for line in inserted.get(len(old), ()) if line]
+    if tail:
+        if not result[-1].endswith('\n'):
+            result[-1] += newline
+        result += tail
+    return ''.join(result)
+
+
+def _render_lossless(append, stanza, text=None):
+    startup = _new_startup(stanza)
+    if startup is not None:
+        append(startup._render())
+        append('\n')
+    if text is not None and isinstance(stanza, MultilineStanza):
+        append(_merge_lines(stanza, text))
+        return
+    append(stanza._render().rstrip('\n'))
+    append('\n')
+
+
+def serialize_layout(interfaces_file):
+    """Renders a lossless ``interfaces_file``: the text read is kept as is, but for the changed lines of
+    the edited stanzas, rendered again in place, the removed stanzas, and the new ones, appended."""
+    f = interfaces_file
+    present = set(map(id, f.interfaces))
+    present.update(map(id, f.mappings))
+    present.update(map(id, f.sources))
+    index = f._tree.index
+    parts = []
+    append = parts.append
+    for segment in f._layout:
+        if isinstance(segment, str):
+            append(segment)
+            continue
+
+        text, stanzas, texts = segment
+        if stanzas and isinstance(stanzas[0], StartupStanza):
+            startup = stanzas[0]
+            if startup._text is text or any(i.startup is startup for i in index.get(startup.iface_name, ())):
+                append(text)
+            continue
+
+        kept = [s for s in stanzas if id(s) in present]
+        if len(kept) == len(stanzas) and all(s._text is t and _new_startup(s) is None
+                                             for s, t in zip(stanzas, texts)):
+            append(text)
+        elif len(stanzas) == 1 and kept:
+            _render_lossless(append, kept[0], text)
+        else:
+            for stanza in kept:
+                _render_lossless(append, stanza)
+        present.difference_update(map(id, kept))
+
+    new = [s for s in f.interfaces + f.mappings + f.sources if id(s) in present]
+    if new:
+        if parts and not parts[-1].endswith('\n'):
+            append('\n')
+        for stanza in new:
+            append('\n')
+            _render_lossless(append, stanza)
+    return ''.join(parts)
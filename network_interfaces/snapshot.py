@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Binary snapshots of the tokenized files of a tree, to skip the parsing on a cold start.
+
+A snapshot is written next to the root file, hidden so that no ``source`` glob picks it up. It holds,
+for every file of the tree, its ``stat`` and SHA-256 at the time of the snapshot and its records, and
+the listings of the sourced directories. It is memory-mapped and only the records of the files
+actually read are decoded, so a lazy tree built on a snapshot decodes the files it loads only.
+
+Layout: the header, the table of the files, then the records of each file and the listings, encoded
+with :mod:`marshal`, which keeps the strings interned and decodes in C. A snapshot is only read by the
+interpreter version that wrote it.
+"""
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+from .parser import tokenize_data
+from .scan import DirectoryScanner
+__author__ = 'vahid'
+
+
+MAGIC = b'NISNAP01'
+SUFFIX = '.snapshot'
+
+# magic, interpreter, file count, offset and size of the listings.
+_HEADER = struct.Struct('<8s16sIQQ')
+# offset and size of the path, mtime_ns, size, inode, sha256, offset and size of the records.
+_FILE = struct.Struct('<QIqQQ32sQQ')
+_INTERPRETER = ('%s-%d' % (sys.implementation.cache_tag, marshal.version)).encode()[:16].ljust(16, b'\0')
+
+
+def snapshot_filename(filename):
+    """The snapshot of the tree of ``filename``, next to it."""
+    dirname, basename = os.path.split(os.path.abspath(filename))
+    return os.path.join(dirname, '.%s%s' % (basename, SUFFIX))
+
+
+def write_snapshot(interfaces_file, filename=None):
+    """Writes the snapshot of the files of the tree of ``interfaces_file``, as they are on disk, loading
+    its lazy sub-files. Returns the filename of the snapshot, by default :func:`snapshot_filename`."""
+    root = interfaces_file.root
+    if filename is None:
+        filename = snapshot_filename(root.absolute_filename)
+    list(root.iter_files())
+
+    paths = list(root._tree.files)
+    offset = _HEADER.size + _FILE.size * len(paths)
+    entries = []
+    blobs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            content = f.read()
+        encoded = path.encode()
+        records = marshal.dumps(tokenize_data(content, path))
+        entries.append(_FILE.pack(offset, len(encoded), st.st_mtime_ns, st.st_size, st.st_ino,
+                                  hashlib.sha256(content).digest(), offset + len(encoded), len(records)))
+        blobs += [encoded, records]
+        offset += len(encoded) + len(records)
+    listings = marshal.dumps(root._tree.scanner.listings())
+
+    header = _HEADER.pack(MAGIC, _INTERPRETER, len(paths), offset, len(listings))
+    data = b''.join([header] + entries + blobs + [listings])
+
+    dirname, basename = os.path.split(filename)
+    fd, temp_filename = tempfile.mkstemp(prefix='%s.' % basename, suffix='.tmp', dir=dirname or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.unlink(temp_filename)
+        raise
+    return filename
+
+
+class Snapshot(object):
+    """A snapshot written by :func:`write_snapshot`, usable as the ``cache`` of
+    :class:`~network_interfaces.InterfacesFile`::
+
+        with Snapshot(snapshot_filename(path)) as snapshot:
+            f = InterfacesFile(path, cache=snapshot, lazy=True)
+
+    The records of a file are used while its ``(mtime, size, inode)`` is unchanged or, with
+    ``digest=True``, while its SHA-256 is. The other files are parsed, and counted in ``misses``: the
+    snapshot should then be written again. A missing or unreadable snapshot misses every file.
+    """
+
+    def __init__(self, filename, digest=False, scanner=None):
+        self.filename = filename
+        self.digest = digest
+        self.scanner = scanner if scanner is not None else DirectoryScanner()
+        self.hits = 0
+        self.misses = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+        # Absolute filename -> (stat key, sha256, records offset, records length).
+        self._files = {}
+        try:
+            self._open()
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self._files
+
+    def _open(self):
+        with open(self.filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._mmap
+        magic, interpreter, file_count, listings_offset, listings_size = _HEADER.unpack_from(data)
+        if magic != MAGIC or interpreter != _INTERPRETER:
+            raise ValueError('%s is not a snapshot of this interpreter' % self.filename)
+
+        for i in range(file_count):
+            path_offset, path_size, mtime_ns, size, inode, sha256, start, length = \
+                _FILE.unpack_from(data, _HEADER.size + i * _FILE.size)
+            path = data[path_offset:path_offset + path_size].decode()
+            self._files[path] = ((mtime_ns, size, inode), sha256, start, length)
+        self.scanner.update(marshal.loads(data[listings_offset:listings_offset + listings_size]))
+
+    def close(self):
+        self._files = {}
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _records(self, start, length):
+        return marshal.loads(self._mmap[start:start + length])
+
+    def read_records(self, filename, instrument=None):
+        filename = os.path.abspath(filename)
+        entry = self._files.get(filename)
+        content = None
+        if entry is not None and not self.digest:
+            st = os.stat(filename)
+            hit = entry[0] == (st.st_mtime_ns, st.st_size, st.st_ino)
+        else:
+            if instrument is not None:
+                instrument.count('files_opened')
+            with open(filename, 'rb') as f:
+                content = f.read()
+            hit = entry is not None and entry[1] == hashlib.sha256(content).digest()
+
+        if hit:
+            with self._lock:
+                self.hits += 1
+            if instrument is not None:
+                instrument.count('cache_hits')
+            return self._records(entry[2], entry[3])
+
+        with self._lock:
+            self.misses += 1
+        if instrument is not None:
+            instrument.count('cache_misses')
+        if content is None:
+            if instrument is not None:
+                instrument.count('files_opened')
+            with open(filename, 'rb') as f:
+                content = f.read()
+        return tokenize_data(content, filename, instrument)
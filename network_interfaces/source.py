@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
+import os.path
+import re
+from .helpers import rooted
 from .stanza import Stanza
+from .scan import DirectoryScanner
 __author__ = 'vahid'
 
 
+SOURCE_DIRECTORY_PATTERN = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+
 class Source(Stanza):
+    __slots__ = ()
     _type = 'source'
 
     @property
@@ -13,9 +21,19 @@ class Source(Stanza):
     @source_filename.setter
     def source_filename(self, val):
         self._headers[1] = val
+        self._changed()
+
+    @classmethod
+    def expand_glob(cls, pattern, dirname, filename, scanner=None, ignore=(), rootdir=None, instrument=None):
+        scanner = scanner if scanner is not None else DirectoryScanner()
+        return [cls(filename, 'source', path) for path in scanner.glob(pattern, dirname, ignore, rootdir, instrument)]
+
+    def sub_filenames(self, dirname, scanner=None, ignore=(), rootdir=None, instrument=None):
+        return [self.source_filename]
 
 
 class SourceDirectory(Stanza):
+    __slots__ = ()
     _type = 'source-directory'
 
     @property
@@ -25,3 +43,11 @@ class SourceDirectory(Stanza):
     @source_directory.setter
     def source_directory(self, val):
         self._headers[1] = val
+        self._changed()
+
+    def sub_filenames(self, dirname, scanner=None, ignore=(), rootdir=None, instrument=None):
+        """The files of the directory, an absolute one is listed under ``rootdir``, if any."""
+        d = self.source_directory
+        scanner = scanner if scanner is not None else DirectoryScanner()
+        path = os.path.join(dirname, rooted(d, rootdir))
+        return [os.path.join(d, f) for f in scanner.files(path, SOURCE_DIRECTORY_PATTERN, ignore, instrument)]
@@ -1,21 +1,50 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import re
+from sys import intern
 
-from .helpers import clean_list, list_hash
+from .helpers import split_cells, list_hash
+from .errors import ValidationError
 
 __author__ = 'vahid'
 
 
+STANZA_PATTERN = re.compile(r'^(iface|mapping|auto|allow-\S+|source|source-directory)(\s|$)')
+
+
 class Stanza(object):
+    __slots__ = ('_filename', '_headers', '_owner', '_hash', '_digest', '_text')
     _type = None
-    _filename = None
-    _headers = None
+
+    # Keyword -> class dispatch tables, filled as subclasses are defined.
+    # Types ending with a dash, like ``allow-``, are matched as prefixes.
+    _types = {}
+    _prefix_types = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super(Stanza, cls).__init_subclass__(**kwargs)
+        # Real attributes, everything else is an option for the multiline stanzas.
+        cls._attributes = frozenset(dir(cls))
+        stanza_type = cls.__dict__.get('_type')
+        if not stanza_type:
+            return
+        if stanza_type.endswith('-'):
+            Stanza._prefix_types += ((stanza_type, cls),)
+        else:
+            Stanza._types[stanza_type] = cls
 
     def __init__(self, filename, *headers):
         self._filename = filename
         self._headers = list(headers)
+        self._owner = None
+        self._hash = None
+        self._digest = None
+        self._text = None
 
     def __repr__(self):
+        return self._render()
+
+    def _render(self):
         return ' '.join(self._headers)
 
     def _headers_hash(self):
@@ -25,13 +54,27 @@ class Stanza(object):
         return result
 
     def __hash__(self):
+        if self._hash is None:
+            self._hash = self._compute_hash()
+        return self._hash
+
+    def _compute_hash(self):
         return \
             self._type.__hash__() ^ \
             self._headers_hash()
 
+    def _canonical_lines(self):
+        yield ' '.join(self._headers)
+
+    def digest(self):
+        """SHA-256 of the stanza's canonical form, stable across processes and hosts unlike ``hash()``."""
+        if self._digest is None:
+            self._digest = hashlib.sha256('\n'.join(self._canonical_lines()).encode()).digest()
+        return self._digest
+
     @classmethod
     def is_stanza(cls, s):
-        return re.match(r'^(iface|mapping|auto|allow-|source).*', s)
+        return STANZA_PATTERN.match(s)
 
     @classmethod
     def subclasses(cls):
@@ -39,34 +82,78 @@ class Stanza(object):
                                        for g in s.subclasses()]
 
     @classmethod
-    def create(cls, header, filename):
-        cells = re.split('\s+', header)
-        cells = clean_list(cells)
-        stanza_type = cells[0]
-        subclasses = cls.subclasses()
+    def type_for(cls, keyword):
+        result = Stanza._types.get(keyword)
+        if result is not None:
+            return result
 
-        # Checking for exact match
-        for subclass in subclasses:
-            if subclass._type and stanza_type == subclass._type:
-                return subclass(filename, *cells)
+        for prefix, subclass in Stanza._prefix_types:
+            if keyword.startswith(prefix) and len(keyword) > len(prefix):
+                return subclass
 
-        # Partial start match
-        for subclass in subclasses:
-            if subclass._type and stanza_type.startswith(subclass._type):
-                return subclass(filename, *cells)
-
-    def validate(self, allow_correction=False):
-        pass
+    @classmethod
+    def create(cls, header, filename):
+        cells = split_cells(header)
+        subclass = cls.type_for(cells[0]) if cells else None
+        if subclass is not None:
+            return subclass(filename, *cells)
+
+    def validate(self, allow_correction=False, strict=False):
+        errors = self._check(allow_correction, strict)
+        if errors:
+            raise ValidationError(errors)
+        return True
+
+    def _check(self, allow_correction=False, strict=False):
+        """Returns the list of :class:`~network_interfaces.validation.Error` of the stanza, see
+        :func:`~network_interfaces.validation.check_iface` for ``strict``."""
+        return []
+
+    def _copy(self, filename):
+        """An unowned copy of the stanza for the file ``filename``, built without parsing it again."""
+        other = object.__new__(type(self))
+        setattr_ = object.__setattr__
+        setattr_(other, '_filename', filename)
+        setattr_(other, '_headers', list(self._headers))
+        for slot in ('_owner', '_hash', '_digest', '_text'):
+            setattr_(other, slot, None)
+        return other
+
+    def _changed(self):
+        old_hash = self._hash
+        self._hash = None
+        self._digest = None
+        self._text = None
+        if self._owner is not None:
+            self._owner._stanza_changed(self, old_hash)
 
 
 class MultilineStanza(Stanza):
-    _items = None
+    """A stanza followed by option lines.
+
+    Options are kept in ``_items`` in their on-disk order, repeated keys included, and ``_keys``
+    maps each interned key to its first entry, which makes the lookups O(1).
+    """
+    __slots__ = ('_items', '_keys')
 
     def __init__(self, *args, **kwargs):
         super(MultilineStanza, self).__init__(*args, **kwargs)
         self._items = []
+        self._keys = {}
+
+    def _copy(self, filename):
+        other = super(MultilineStanza, self)._copy(filename)
+        items = [list(cells) for cells in self._items]
+        keys = {}
+        for cells in items:
+            keys.setdefault(cells[0], cells)
+        object.__setattr__(other, '_items', items)
+        object.__setattr__(other, '_keys', keys)
+        return other
 
     def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
         try:
             return self[item]
         except (KeyError, IndexError):
@@ -74,13 +161,13 @@ class MultilineStanza(Stanza):
             #raise AttributeError('%s %s' % (object.__repr__(self), item))
 
     def __setattr__(self, key, value):
-        if hasattr(self.__class__, key):
+        if key in self._attributes:
             super(Stanza, self).__setattr__(key, value)
         else:
             self[key] = value
 
     def __delattr__(self, item):
-        if hasattr(self.__class__, item):
+        if item in self._attributes:
             super(Stanza, self).__delattr__(item)
         else:
             del self[item]
@@ -107,20 +194,31 @@ class MultilineStanza(Stanza):
         else:
             del cells[1:]
             cells += values
+            self._changed()
 
     def __delitem__(self, item):
         if not isinstance(item, str):
             raise TypeError(type(item))
         self.__delitem_internal(item)
 
-    def __repr__(self):
-        items = [(i[0], ' '.join(i[1:]).strip()) for i in self._items]
-        return '%s\n%s\n' % (
-            super(MultilineStanza, self).__repr__(),
-            '\n'.join(['  %s %s' % (i[0], i[1]) for i in items if i[1]]))
-
-    def __hash__(self):
-        return super(MultilineStanza, self).__hash__() ^ self._items_hash()
+    def _render(self):
+        lines = [' '.join(self._headers)]
+        for cells in self._items:
+            value = ' '.join(cells[1:]).strip()
+            if value:
+                lines.append('  %s %s' % (cells[0], value))
+        if len(lines) == 1:
+            lines.append('')
+        lines.append('')
+        return '\n'.join(lines)
+
+    def _compute_hash(self):
+        return super(MultilineStanza, self)._compute_hash() ^ self._items_hash()
+
+    def _canonical_lines(self):
+        yield from super(MultilineStanza, self)._canonical_lines()
+        for i in self._items:
+            yield ' '.join(i)
 
     def update(self, other):
         if isinstance(other, dict):
@@ -135,22 +233,70 @@ class MultilineStanza(Stanza):
             result ^= list_hash(i)
         return result
 
+    def _replace_content(self, other):
+        self._headers = other._headers
+        self._items = other._items
+        self._keys = other._keys
+        self._changed()
+
+    def _set_all(self, key, values):
+        """Replaces every ``key`` option with one per value, where the first one was or at the end."""
+        key = intern(key)
+        entries = [[key] + split_cells(v) for v in values]
+        position = len(self._items)
+        if key in self._keys:
+            position = next(i for i, c in enumerate(self._items) if c[0] == key)
+        items = [c for c in self._items if c[0] != key]
+        items[position:position] = entries
+        self._items = items
+        if entries:
+            self._keys[key] = entries[0]
+        else:
+            self._keys.pop(key, None)
+        self._changed()
+
+    def _entries(self, key):
+        if key not in self._keys:
+            return []
+        return [i for i in self._items if i[0] == key]
+
+    def get_all(self, key):
+        """Returns the values of every ``key`` option, in order, for the keys that may be repeated."""
+        return [' '.join(i[1:]) for i in self._entries(key)]
+
     def add_entry(self, l):
-        cells = re.split('\s+', l)
-        cells = clean_list(cells)
-        if cells and cells not in self._items:
-            self._items.append(cells)
+        if self._add_cells(split_cells(l)):
+            self._changed()
+
+    def _add_cells(self, cells):
+        if not cells:
+            return False
+
+        key = cells[0] = intern(cells[0])
+        if key not in self._keys:
+            self._keys[key] = cells
+        elif cells in self._entries(key):
+            return False
+        self._items.append(cells)
+        return True
 
     def __getitem_internal(self, item):
-        key = item.replace('_', '-')
-        for i in self._items:
-            if i[0] == key:
-                return i
-        return None
+        result = self._keys.get(item)
+        if result is None and '_' in item:
+            result = self._keys.get(item.replace('_', '-'))
+        return result
 
     def __delitem_internal(self, item):
-        key = item.replace('_', '-')
-        for i in self._items:
-            if i[0] == key:
-                self._items.remove(i)
-                return
+        cells = self.__getitem_internal(item)
+        if cells is None:
+            return
+
+        key = cells[0]
+        del self._keys[key]
+        index = next(i for i, c in enumerate(self._items) if c is cells)
+        del self._items[index]
+        for c in self._items[index:]:
+            if c[0] == key:
+                self._keys[key] = c
+                break
+        self._changed()
@@ -2,7 +2,10 @@
 from .stanza import Stanza
 __author__ = 'vahid'
 
+
 class StartupStanza(Stanza):
+    __slots__ = ()
+
     @property
     def mode(self):
         return self._headers[0]
@@ -13,9 +16,11 @@ class StartupStanza(Stanza):
 
 
 class Auto(StartupStanza):
+    __slots__ = ()
     _type = 'auto'
 
 
 class Allow(StartupStanza):
+    __slots__ = ()
     _type = 'allow-'
 
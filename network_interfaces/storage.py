@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import stat
+import tempfile
+
+from .errors import RollbackError
+__author__ = 'vahid'
+
+
+ROLLBACK_SUFFIX = '.rollback'
+
+
+def _fsync_directory(dirname):
+    try:
+        fd = os.open(dirname or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_temp(filename, content):
+    dirname, basename = os.path.split(filename)
+    fd, temp_filename = tempfile.mkstemp(prefix='.%s.' % basename, suffix='.tmp', dir=dirname or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_filename, mode)
+    except BaseException:
+        os.unlink(temp_filename)
+        raise
+    return temp_filename
+
+
+def _restore(filename, backup_filename):
+    if backup_filename is None:
+        os.unlink(filename)
+        return
+
+    with open(backup_filename) as f:
+        content = f.read()
+    os.replace(_write_temp(filename, content), filename)
+
+
+def _unlink(filename):
+    try:
+        os.unlink(filename)
+    except OSError:
+        pass
+
+
+def commit(writes):
+    """Atomically replaces a batch of files.
+
+    ``writes`` is a list of ``(filename, content, backup)`` tuples. A symbolic link is followed: its target
+    is replaced, the link is kept. Every content is first written and fsync'd to a temporary file in the
+    target's directory, then the existing targets are copied to ``target + '.rollback'`` and the temporary
+    files are renamed over the targets. If anything fails, the files that were already replaced are
+    restored from their rollback copies, so either all of them are committed or none. Only once every
+    file is replaced, the rollback copies become the ``filename + backup`` backups, or are removed when
+    ``backup`` is empty.
+
+    A rollback copy that could not be restored is kept and
+    :class:`~network_interfaces.errors.RollbackError` is raised, from the error of the commit.
+    """
+    targets = [os.path.realpath(filename) for filename, content, backup in writes]
+    temp_filenames = []
+    rollbacks = []
+    replaced = []
+    try:
+        for target, (filename, content, backup) in zip(targets, writes):
+            temp_filenames.append(_write_temp(target, content))
+
+        for target in targets:
+            if os.path.exists(target):
+                rollback_filename = target + ROLLBACK_SUFFIX
+                shutil.copyfile(target, rollback_filename)
+                rollbacks.append(rollback_filename)
+            else:
+                rollbacks.append(None)
+
+        for target, temp_filename, rollback_filename in zip(targets, temp_filenames, rollbacks):
+            os.replace(temp_filename, target)
+            replaced.append((target, rollback_filename))
+
+    except BaseException as ex:
+        failures = []
+        for target, rollback_filename in reversed(replaced):
+            try:
+                _restore(target, rollback_filename)
+            except OSError as error:
+                failures.append((target, rollback_filename, error))
+
+        for temp_filename in temp_filenames[len(replaced):]:
+            _unlink(temp_filename)
+        kept = set(f[1] for f in failures)
+        for rollback_filename in rollbacks:
+            if rollback_filename is not None and rollback_filename not in kept:
+                _unlink(rollback_filename)
+        if failures:
+            raise RollbackError(failures[::-1]) from ex
+        raise
+
+    for (filename, content, backup), rollback_filename in zip(writes, rollbacks):
+        if rollback_filename is None:
+            continue
+        if backup:
+            # Next to the link, which may be on another filesystem than its target.
+            shutil.move(rollback_filename, filename + backup)
+        else:
+            os.unlink(rollback_filename)
+
+    for dirname in set(os.path.dirname(target) for target in targets):
+        _fsync_directory(dirname)
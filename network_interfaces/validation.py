@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Validation rules of the ``iface`` and ``mapping`` stanzas.
+
+The rules of ``interfaces(5)`` are compiled once into lookup tables: for each ``(address family,
+method)`` the required options and the options of the method, and for each option the checker of its
+value. In strict mode, the addressing options of the other methods of the family, like an ``address``
+of a ``dhcp`` interface, are rejected: ifupdown ignores them, but ifupdown2 uses some, like the
+``address`` of a ``manual`` interface. The other options are passed to the ``if-up.d`` hooks by
+ifupdown, like ``dns-*``, ``wpa-*`` or ``bridge_ports``, and are accepted as is.
+"""
+import ipaddress
+import re
+from collections import namedtuple
+__author__ = 'vahid'
+
+
+Error = namedtuple('Error', ['filename', 'name', 'option', 'message'])
+
+METHODS = {
+    'inet': {
+        'loopback': ((), ()),
+        'static': (('address',), ('address', 'netmask', 'broadcast', 'network', 'metric', 'gateway', 'pointopoint',
+                                  'hwaddress', 'mtu', 'scope')),
+        'manual': ((), ('hwaddress', 'mtu')),
+        'dhcp': ((), ('hostname', 'metric', 'leasehours', 'leasetime', 'vendor', 'client', 'hwaddress')),
+        'bootp': ((), ('bootfile', 'server', 'hwaddr')),
+        'tunnel': (('address', 'mode', 'endpoint'), ('address', 'mode', 'endpoint', 'dstaddr', 'local', 'gateway',
+                                                     'ttl', 'mtu')),
+        'ppp': ((), ('provider', 'unit', 'options')),
+        'wvdial': ((), ('provider',)),
+        'ipv4ll': ((), ()),
+    },
+    'inet6': {
+        'auto': ((), ('privext', 'accept_ra', 'dhcp', 'request_prefix', 'll-attempts', 'll-interval')),
+        'loopback': ((), ()),
+        'static': (('address',), ('address', 'netmask', 'gateway', 'media', 'hwaddress', 'mtu', 'accept_ra',
+                                  'autoconf', 'privext', 'scope', 'preferred-lifetime', 'dad-attempts',
+                                  'dad-interval')),
+        'manual': ((), ('hwaddress', 'mtu')),
+        'dhcp': ((), ('hwaddress', 'accept_ra', 'autoconf', 'request_prefix', 'll-attempts', 'll-interval')),
+        'v4tunnel': (('endpoint',), ('address', 'netmask', 'endpoint', 'local', 'gateway', 'ttl', 'mtu',
+                                     'preferred-lifetime')),
+        '6to4': (('local',), ('local', 'ttl', 'mtu', 'preferred-lifetime')),
+    },
+    'ipx': {
+        'static': ((), ('frame', 'netnum')),
+        'dynamic': ((), ('frame',)),
+    },
+    'can': {
+        'static': (('bitrate',), ('bitrate', 'samplepoint', 'loopback', 'listenonly', 'triple', 'oneshot',
+                                  'berr')),
+    },
+}
+
+# Options ignored by the methods that do not list them, which is always a mistake.
+ADDRESSING = frozenset(('address', 'netmask', 'broadcast', 'network', 'gateway', 'pointopoint'))
+
+_VERSIONS = {'inet': 4, 'inet6': 6}
+_MAC = re.compile(r'^(ether\s+)?([0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}$|^random$')
+
+
+def _address(value, version):
+    address = ipaddress.ip_address(value)
+    if version and address.version != version:
+        raise ValueError('%s is not an IPv%d address' % (value, version))
+
+
+def _interface(value, version):
+    interface = ipaddress.ip_interface(value)
+    if version and interface.version != version:
+        raise ValueError('%s is not an IPv%d address' % (value, version))
+
+
+def _netmask(value, version):
+    if value.isdigit():
+        if int(value) > (32 if version == 4 else 128):
+            raise ValueError('invalid prefix length %s' % value)
+        return
+    if version == 6:
+        raise ValueError('invalid prefix length %s' % value)
+    ipaddress.IPv4Network('0.0.0.0/%s' % value)
+
+
+def _broadcast(value, version):
+    if value not in ('+', '-'):
+        _address(value, version)
+
+
+def _integer(minimum, maximum=None):
+    def check(value, version):
+        if not value.isdigit() or int(value) < minimum or (maximum is not None and int(value) > maximum):
+            raise ValueError('%s is not an integer in [%s, %s]' % (value, minimum, maximum or ''))
+    return check
+
+
+def _hwaddress(value, version):
+    if not _MAC.match(value):
+        raise ValueError('invalid hardware address %s' % value)
+
+
+def _nameservers(value, version):
+    for address in value.split():
+        _address(address, None)
+
+
+FORMATS = {
+    'address': _interface,
+    'netmask': _netmask,
+    'broadcast': _broadcast,
+    'network': _address,
+    'gateway': _address,
+    'pointopoint': _address,
+    'dstaddr': _address,
+    'endpoint': _address,
+    'local': _address,
+    'metric': _integer(0),
+    'mtu': _integer(68, 65535),
+    'leasehours': _integer(0),
+    'leasetime': _integer(0),
+    'ttl': _integer(0, 255),
+    'hwaddress': _hwaddress,
+    'dns-nameservers': _nameservers,
+}
+
+# Rule = (required options, options of the method, addressing options of the other methods of the family)
+Rule = namedtuple('Rule', ['required', 'options', 'foreign'])
+
+
+def _compile():
+    rules = {}
+    for family, methods in METHODS.items():
+        family_options = frozenset(o for _, options in methods.values() for o in options) & ADDRESSING
+        for method, (required, options) in methods.items():
+            rules[family, method] = Rule(frozenset(required), frozenset(options), family_options - frozenset(options))
+    return rules
+
+
+RULES = _compile()
+
+
+def _filename(stanza):
+    return stanza._owner.filename if stanza._owner is not None else stanza._filename
+
+
+def _option(stanza, key):
+    cells = stanza._keys.get(key)
+    return ' '.join(cells[1:]) if cells else None
+
+
+def _check_subnet(iface, error, allow_correction):
+    # The netmask, network and broadcast of the static IPv4 interfaces must match the address.
+    address = _option(iface, 'address')
+    netmask = _option(iface, 'netmask')
+    network = _option(iface, 'network')
+    broadcast = _option(iface, 'broadcast')
+    if broadcast in ('+', '-'):
+        broadcast = None
+
+    if '/' in address:
+        subnet = ipaddress.IPv4Interface(address).network
+    elif netmask is not None:
+        subnet = ipaddress.IPv4Interface('%s/%s' % (address, netmask)).network
+    else:
+        derived = None
+        if network is not None and broadcast is not None:
+            try:
+                derived = ipaddress.summarize_address_range(
+                    ipaddress.IPv4Address(network), ipaddress.IPv4Address(broadcast))
+                derived = next(derived)
+                if int(derived.broadcast_address) != int(ipaddress.IPv4Address(broadcast)) or \
+                        ipaddress.IPv4Address(address.split('/')[0]) not in derived:
+                    derived = None
+            except ValueError:
+                derived = None
+        if derived is None or not allow_correction:
+            error('netmask', 'netmask is required')
+            return
+        iface['netmask'] = str(derived.netmask)
+        return
+
+    for key, value, expected in (('network', network, subnet.network_address),
+                                 ('broadcast', broadcast, subnet.broadcast_address)):
+        if value is None or ipaddress.IPv4Address(value) == expected:
+            continue
+        if allow_correction:
+            iface[key] = str(expected)
+        else:
+            error(key, '%s %s does not match %s' % (key, value, subnet))
+
+
+def check_iface(iface, allow_correction=False, strict=False):
+    """Returns the list of :class:`Error` of an ``iface`` stanza, after fixing what can be fixed with
+    ``allow_correction``: the missing netmask from the network and broadcast, and the network and
+    broadcast not matching the address and netmask. The addressing options of the other methods are
+    errors only if ``strict``."""
+    errors = []
+    family, method = iface.address_family, iface.method
+
+    def error(option, message):
+        errors.append(Error(_filename(iface), iface.name, option, message))
+
+    rule = RULES.get((family, method))
+    if rule is None:
+        error(None, 'unknown method %s %s' % (family, method))
+        return errors
+
+    version = _VERSIONS.get(family)
+    for cells in iface._items:
+        key = cells[0]
+        if strict and key in rule.foreign:
+            error(key, '%s is not an option of %s %s' % (key, family, method))
+            continue
+        check = FORMATS.get(key)
+        if check is not None:
+            try:
+                check(' '.join(cells[1:]), version)
+            except ValueError as ex:
+                error(key, str(ex))
+
+    keys = iface._keys
+    for key in rule.required:
+        if key not in keys:
+            error(key, '%s is required by %s %s' % (key, family, method))
+
+    if not errors and family == 'inet' and method == 'static':
+        _check_subnet(iface, error, allow_correction)
+    elif not errors and family == 'inet6' and method == 'static':
+        if '/' not in _option(iface, 'address') and 'netmask' not in keys:
+            error('netmask', 'netmask is required')
+    return errors
+
+
+def check_mapping(mapping, allow_correction=False):
+    if 'script' in mapping._keys:
+        return []
+    return [Error(_filename(mapping), mapping.name, 'script', 'script is required')]
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+from .source import SourceDirectory
+__author__ = 'vahid'
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyBackend(object):
+    """Watches directories with Linux inotify, through ctypes."""
+
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError('inotify is not available')
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watches = {}
+
+    def sync(self, dirnames):
+        for dirname in set(dirnames) - set(self._watches.values()):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirname), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = dirname
+        for wd, dirname in list(self._watches.items()):
+            if dirname not in dirnames:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def wait(self, timeout):
+        """Returns the changed ``(dirname, name)`` pairs, or ``None`` when events were lost."""
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+
+        changes = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                elif wd in self._watches:
+                    changes.add((self._watches[wd], os.fsdecode(name)))
+        return changes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingBackend(object):
+    """Watches directories by comparing the ``stat`` of their entries every ``interval`` seconds."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._state = {}
+
+    @staticmethod
+    def _scan(dirname):
+        entries = {}
+        try:
+            names = os.listdir(dirname)
+        except OSError:
+            return entries
+        for name in names:
+            try:
+                st = os.stat(os.path.join(dirname, name))
+            except OSError:
+                continue
+            entries[name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return entries
+
+    def sync(self, dirnames):
+        self._state = {d: self._state[d] if d in self._state else self._scan(d) for d in dirnames}
+
+    def wait(self, timeout):
+        interval = self.interval if timeout is None else min(self.interval, timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changes = set()
+            for dirname, previous in self._state.items():
+                current = self._scan(dirname)
+                for name in set(previous) | set(current):
+                    if previous.get(name) != current.get(name):
+                        changes.add((dirname, name))
+                self._state[dirname] = current
+            if changes or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+            time.sleep(interval)
+
+    def close(self):
+        self._state = {}
+
+
+class Watcher(object):
+    """Keeps a loaded :class:`~network_interfaces.InterfacesFile` tree in sync with the filesystem.
+
+    Only the changed files are parsed again, see :meth:`InterfacesFile.reload`, and ``callback`` is called
+    with the list of :class:`~network_interfaces.events.ChangeEvent` of each update. inotify is used when
+    available, otherwise the directories are polled every ``interval`` seconds; pass ``inotify=False`` to
+    force polling.
+
+    The tree is patched by the thread calling :meth:`poll`, or by the one started with :meth:`start`, the
+    caller is responsible for synchronizing its own accesses to it.
+    """
+
+    def __init__(self, interfaces_file, callback=None, interval=1.0, inotify=None):
+        self.interfaces_file = interfaces_file
+        self.callback = callback
+        self.backend = None
+        if inotify is not False:
+            try:
+                self.backend = InotifyBackend()
+            except OSError:
+                if inotify:
+                    raise
+        if self.backend is None:
+            self.backend = PollingBackend(interval)
+        self._stop = threading.Event()
+        self._thread = None
+        self._sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _loaded_files(self):
+        # Files of the tree that are loaded, parents first, without loading the lazy ones.
+        stack = [self.interfaces_file]
+        while stack:
+            f = stack.pop()
+            yield f
+            if f._sub_files is not None:
+                stack.extend(reversed(f._sub_files))
+
+    def _sync(self):
+        self._files = {}
+        # Directory -> the files that source files from it, reloaded when its entries change.
+        self._includers = {}
+        for f in self._loaded_files():
+            self._files[f.absolute_filename] = f
+            self._includers.setdefault(f.absolute_dirname, [])
+            if f._sub_files is None:
+                continue
+            for source in f.sources:
+                if isinstance(source, SourceDirectory):
+                    dirname = os.path.normpath(os.path.join(f.absolute_dirname, source.source_directory))
+                    self._includers.setdefault(dirname, []).append(f)
+            for sub_file in f._sub_files:
+                self._includers.setdefault(sub_file.absolute_dirname, []).append(f)
+        self.backend.sync(set(self._includers))
+
+    @staticmethod
+    def _depth(f):
+        depth = 0
+        while f.parent is not None:
+            f = f.parent
+            depth += 1
+        return depth
+
+    def _affected(self, changes):
+        affected = {}
+        for dirname, name in changes:
+            path = os.path.join(dirname, name)
+            f = self._files.get(path)
+            if f is not None and os.path.isfile(path):
+                affected.setdefault(id(f), (f, False))
+            elif f is not None and f.parent is not None:
+                affected[id(f.parent)] = (f.parent, True)
+            else:
+                for includer in self._includers.get(dirname, ()):
+                    affected[id(includer)] = (includer, True)
+        return sorted(affected.values(), key=lambda x: self._depth(x[0]))
+
+    def update(self, changes):
+        """Reloads the files affected by the changed ``(dirname, name)`` pairs, or the whole loaded
+        tree when ``changes`` is ``None``. Returns the list of change events."""
+        if changes is None:
+            affected = [(f, True) for f in self._loaded_files()]
+        else:
+            affected = self._affected(changes)
+
+        events = []
+        for f, rescan in affected:
+            # A parent reload may have dropped it.
+            if self._files.get(f.absolute_filename) is not f or not os.path.isfile(f.absolute_filename):
+                continue
+            events += f.reload(rescan=rescan)
+            self._sync()
+
+        if events and self.callback is not None:
+            self.callback(events)
+        return events
+
+    def poll(self, timeout=None):
+        """Waits up to ``timeout`` seconds for changes, applies them and returns their events."""
+        changes = self.backend.wait(timeout)
+        if changes == set():
+            return []
+        return self.update(changes)
+
+    def run(self, timeout=0.5):
+        """Applies the changes until :meth:`stop` is called."""
+        while not self._stop.is_set():
+            self.poll(timeout)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='network-interfaces-watcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.backend.close()
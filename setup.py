@@ -34,6 +34,9 @@ setup(
     platforms=["any"],
     long_description=read('README.md'),
     install_requires=dependencies,
+    entry_points={
+        'console_scripts': ['network-interfaces-audit = network_interfaces.audit:main'],
+    },
     classifiers=[
         "License :: Freeware",
         'Intended Audience :: Developers',
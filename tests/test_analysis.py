@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile
+from network_interfaces.analysis import analyze, extract, OVERLAP, DUPLICATE_ADDRESS, GATEWAY_OUTSIDE, \
+    NETWORK_MISMATCH, BROADCAST_MISMATCH, INVALID
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+CONTENT = """
+iface eth0 inet static
+  address 10.0.0.2
+  netmask 255.255.255.0
+  gateway 10.0.0.1
+  network 10.0.0.0
+  broadcast 10.0.0.255
+
+iface eth1 inet static
+  address 10.0.0.130/25
+  gateway 10.0.1.1
+
+iface eth2 inet static
+  address 10.0.0.2
+  netmask 255.255.255.252
+  broadcast 10.0.0.7
+
+iface eth3 inet static
+  address 192.168.1.1/24
+  network 192.168.0.0
+
+iface eth4 inet static
+  address 10.1.2.3
+  netmask 255.0.0.255
+
+iface eth5 inet6 static
+  address 2001:db8::1
+  netmask 64
+  gateway 2001:db8::ffff
+
+iface eth6 inet6 static
+  address 2001:db8::2/48
+  gateway 2001:db9::1
+"""
+
+
+class AnalysisCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = join(self.temp_dir, 'interfaces')
+        with open(self.filename, 'w') as f:
+            f.write(CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_extract(self):
+        tables, findings = extract(InterfacesFile(self.filename))
+        inet = tables['inet']
+        self.assertEqual(inet.names, ['eth0', 'eth1', 'eth2', 'eth3'])
+        self.assertEqual(inet.prefix.tolist(), [24, 25, 30, 24])
+        self.assertEqual(inet.address[0], 0x0a000002)
+        self.assertEqual(inet.has_gateway, bytearray([1, 1, 0, 0]))
+        self.assertEqual(tables['inet6'].names, ['eth5', 'eth6'])
+        self.assertEqual([(f.check, f.names) for f in findings], [(INVALID, ('eth4',))])
+
+    def test_analyze(self):
+        findings = sorted((f.check, f.names) for f in analyze(InterfacesFile(self.filename)))
+        self.assertEqual(findings, sorted([
+            (INVALID, ('eth4',)),
+            (OVERLAP, ('eth0', 'eth2')),
+            (OVERLAP, ('eth0', 'eth1')),
+            (OVERLAP, ('eth6', 'eth5')),
+            (DUPLICATE_ADDRESS, ('eth0', 'eth2')),
+            (GATEWAY_OUTSIDE, ('eth1',)),
+            (GATEWAY_OUTSIDE, ('eth6',)),
+            (BROADCAST_MISMATCH, ('eth2',)),
+            (NETWORK_MISMATCH, ('eth3',)),
+        ]))
+
+    def test_data(self):
+        f = InterfacesFile(join(data_dir, 'interfaces_one'))
+        self.assertEqual(analyze(f), [])
+        self.assertEqual(len(extract(f)[0]['inet']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
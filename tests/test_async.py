@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath, exists
+
+from network_interfaces import InterfacesFile, ParseCache
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class AsyncCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_aload(self):
+        for name in ('interfaces_one', 'interfaces_two', 'interfaces_three'):
+            filename = join(self.data_dir, name)
+            serial = InterfacesFile(filename)
+            f = asyncio.run(InterfacesFile.aload(filename, max_concurrency=2))
+            self.assertEqual([s.absolute_filename for s in f.iter_files()],
+                             [s.absolute_filename for s in serial.iter_files()])
+            self.assertEqual(f.digest(recursive=True), serial.digest(recursive=True))
+            self.assertEqual(f.get_iface('eth1').startup.mode, 'auto')
+            self.assertIsNone(f._tree.prefetched)
+
+        cache = ParseCache()
+        filename = join(self.data_dir, 'interfaces_one')
+        asyncio.run(InterfacesFile.aload(filename, cache=cache))
+        self.assertEqual(len(cache), 5)
+        f = asyncio.run(InterfacesFile.aload(filename, cache=cache, lazy=True))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(f.get_iface('wlan1').method, 'dhcp')
+
+        self.assertRaises(FileNotFoundError, asyncio.run, InterfacesFile.aload(join(self.data_dir, 'missing')))
+
+    def test_asave(self):
+        filename = join(self.data_dir, 'interfaces_one')
+
+        async def edit():
+            f = await InterfacesFile.aload(filename)
+            f.get_iface('eth1').hostname = 'box'
+            return await f.asave(recursive=True)
+
+        eth1_filename = join(self.data_dir, 'interfaces.d', 'eth1')
+        self.assertEqual(asyncio.run(edit()), [eth1_filename])
+        self.assertTrue(exists(eth1_filename + '.back'))
+        self.assertEqual(InterfacesFile(filename).get_iface('eth1').hostname, 'box')
+
+
+if __name__ == '__main__':
+    unittest.main()
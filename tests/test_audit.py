@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from os.path import join, dirname, abspath
+
+from network_interfaces.audit import audit, main, summarize, HostSummary, AuditFailure
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class AuditCase(unittest.TestCase):
+
+    def test_summarize(self):
+        summary = summarize(join(data_dir, 'interfaces_three'), 'host1')
+        self.assertEqual(summary.host, 'host1')
+        interfaces = {i.name: i for i in summary.interfaces}
+        self.assertEqual(
+            interfaces['eth0'][:7], ('eth0', 'iface', 'inet', 'static', '192.168.11.2', '255.255.255.240', 'auto'))
+        self.assertEqual(interfaces['eth2'].type, 'mapping')
+        self.assertEqual(interfaces['wlan0'].startup, 'allow-hotplug')
+        self.assertTrue(interfaces['eth1'].filename.endswith('interfaces.d/eth1'))
+
+    def test_snapshot_directory(self):
+        host = join(tempfile.mkdtemp(), 'host2')
+        self.addCleanup(shutil.rmtree, dirname(host))
+        os.makedirs(join(host, 'etc', 'network', 'interfaces.d'))
+        with open(join(host, 'etc', 'network', 'interfaces'), 'w') as f:
+            f.write('auto lo\niface lo inet loopback\n\nsource /etc/network/interfaces.d/*\n'
+                    'source-directory /etc/network/interfaces.d\n')
+        with open(join(host, 'etc', 'network', 'interfaces.d', 'eth7'), 'w') as f:
+            f.write('iface eth7 inet dhcp\n')
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            summary, = audit([host], executor=executor)
+        self.assertEqual(summary.host, 'host2')
+        # Read from the snapshot, not from the /etc/network of the auditing host.
+        self.assertEqual([i.name for i in summary.interfaces], ['lo', 'eth7'])
+        self.assertEqual(summary.interfaces[1].filename, join(host, 'etc', 'network', 'interfaces.d', 'eth7'))
+
+    def test_audit(self):
+        paths = [join(data_dir, 'interfaces_one'), join(data_dir, 'missing'), join(data_dir, 'interfaces_two')]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(audit(paths, executor=executor))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len([r for r in results if isinstance(r, HostSummary)]), 2)
+        failure, = [r for r in results if isinstance(r, AuditFailure)]
+        self.assertIn('FileNotFoundError', failure.error)
+
+    def test_main(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            status = main([join(data_dir, 'interfaces_two'), join(data_dir, 'missing')])
+        self.assertEqual(status, 1)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted('error' in r for r in results), [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import json
+import shutil
+import tempfile
+import unittest
+from os.path import join
+
+from network_interfaces import InterfacesFile
+from benchmarks.generate import generate
+from benchmarks.run import run, compare, BASELINE
+
+__author__ = 'vahid'
+
+
+class BenchmarksCase(unittest.TestCase):
+
+    def test_generate(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            f = InterfacesFile(generate(join(temp_dir, 'tree'), interfaces=300, depth=3))
+            names = [i.name for sub_file in f.iter_files() for i in sub_file.interfaces + sub_file.mappings]
+            self.assertGreater(len(names), 250)
+            self.assertEqual(f.get_iface('bond0.2').vlan_raw_device, 'bond0')
+            self.assertEqual(f.get_iface('map0').map_HOME, 'map0-home')
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_run(self):
+        results = run(interfaces=100, depth=2, repeat=1)
+        self.assertEqual(compare(results, results, 0), [])
+
+        baseline = {'seconds': {'load': results['seconds']['load'] / 10}, 'memory': {}}
+        (metric, expected, current, ratio), = compare(results, baseline, 0.25)
+        self.assertEqual(metric, 'seconds.load')
+
+        # The committed baseline has every metric of a run.
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        for group in ('seconds', 'memory'):
+            self.assertEqual(sorted(baseline[group]), sorted(results[group]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, ParseCache
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class ParseCacheCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.filename = join(self.data_dir, 'interfaces_two')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_hits_and_misses(self):
+        cache = ParseCache()
+        f1 = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 5))
+
+        f2 = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+        self.assertEqual(hash(f1), hash(f2))
+
+        # The cached records are not shared with the parsed stanzas
+        f2.get_iface('eth0').address = '10.0.0.1'
+        f3 = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual(f3.get_iface('eth0').address, '192.168.11.2')
+
+    def test_stanzas(self):
+        cache = ParseCache()
+        f1 = InterfacesFile(self.filename, cache=cache)
+        records = cache._entries[self.filename][1]
+        self.assertEqual(len(cache.prototypes(self.filename, records)), len(records))
+
+        # The next trees get copies of the parsed stanzas.
+        f2 = InterfacesFile(self.filename, cache=cache)
+        eth0 = f2.get_iface('eth0')
+        self.assertIsNot(eth0, f1.get_iface('eth0'))
+        self.assertIs(eth0._owner, f2)
+        self.assertEqual(f1.digest(recursive=True), f2.digest(recursive=True))
+        eth0.address = '10.0.0.1'
+        eth0.add_entry('mtu 9000')
+        f3 = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual(f3.get_iface('eth0').address, '192.168.11.2')
+        self.assertNotIn('mtu', f3.get_iface('eth0'))
+
+    def test_glob(self):
+        with open(self.filename, 'a') as f:
+            f.write('\nsource more.d/*\n')
+        os.mkdir(join(self.data_dir, 'more.d'))
+        cache = ParseCache()
+        InterfacesFile(self.filename, cache=cache)
+
+        # The glob is expanded again, the file sourcing it is unchanged.
+        with open(join(self.data_dir, 'more.d', 'eth5'), 'w') as f:
+            f.write('iface eth5 inet dhcp\n')
+        f = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual(f.get_iface('eth5').method, 'dhcp')
+
+    def test_changed_sub_file(self):
+        cache = ParseCache()
+        InterfacesFile(self.filename, cache=cache)
+
+        eth1_filename = join(self.data_dir, 'interfaces.d', 'eth1')
+        with open(eth1_filename, 'a') as f:
+            f.write('  hostname test\n')
+        st = os.stat(eth1_filename)
+        os.utime(eth1_filename, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+        f = InterfacesFile(self.filename, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (4, 6))
+        self.assertEqual(f.get_iface('eth1').hostname, 'test')
+
+    def test_lru(self):
+        cache = ParseCache(maxsize=2)
+        InterfacesFile(self.filename, cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(self.filename, cache)
+
+    def test_digest(self):
+        cache = ParseCache(digest=True)
+        InterfacesFile(self.filename, cache=cache)
+        InterfacesFile(self.filename, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
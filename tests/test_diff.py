@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile
+from network_interfaces.diff import diff, apply, Change, ADD, REMOVE, CHANGE
+from network_interfaces.errors import PatchError
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class DiffCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_diff(self):
+        old = InterfacesFile(join(data_dir, 'interfaces_one'))
+        new = InterfacesFile(join(self.data_dir, 'interfaces_one'))
+        self.assertEqual(diff(old, new), [])
+
+        new.get_iface('eth0').gateway = '192.168.11.14'
+        del new.get_iface('eth0').script
+        new.get_iface('wlan0').method = 'dhcp'
+        new.get_iface('wlan1').startup = None
+        new.remove_iface('eth2-home')
+
+        changes = {(c.op, c.key[1]): c for c in diff(old, new)}
+        self.assertEqual(sorted(changes), [('change', 'eth0'), ('change', 'wlan0'), ('change', 'wlan1'),
+                                           ('remove', 'eth2-home')])
+        self.assertEqual(changes['change', 'eth0'].options, {'gateway': ['192.168.11.14'], 'script': []})
+        self.assertIsNone(changes['change', 'eth0'].headers)
+        self.assertEqual(changes['change', 'wlan0'].headers, ['iface', 'wlan0', 'inet', 'dhcp'])
+        self.assertEqual(changes['change', 'wlan1'].startup, '')
+        self.assertEqual(changes['change', 'wlan1'].filename, 'interfaces.d/wlan1')
+        self.assertEqual(changes['remove', 'eth2-home'].key, ['iface', 'eth2-home', 'inet'])
+
+        reverse = {(c.op, c.key[1]) for c in diff(new, old)}
+        self.assertIn((ADD, 'eth2-home'), reverse)
+
+    def test_apply(self):
+        target = InterfacesFile(join(self.data_dir, 'interfaces_three'))
+        new = InterfacesFile(join(data_dir, 'interfaces_two'))
+        new.get_iface('eth1').hostname = 'box'
+        new.get_iface('lo').startup = None
+
+        patch = json.loads(json.dumps([list(c) for c in diff(target, new)]))
+        apply(target, [Change(*c) for c in patch])
+        self.assertEqual(diff(target, new), [])
+        self.assertEqual(target.get_iface('eth1').hostname, 'box')
+        self.assertEqual(target.digest(recursive=True), new.digest(recursive=True))
+
+        target.save(recursive=True)
+        self.assertEqual(diff(InterfacesFile(join(self.data_dir, 'interfaces_three')), new), [])
+
+    def test_apply_errors(self):
+        target = InterfacesFile(join(self.data_dir, 'interfaces_one'))
+        self.assertRaises(PatchError, apply, target, [Change(CHANGE, None, ['iface', 'eth9', 'inet'], None, '', {})])
+        self.assertRaises(PatchError, apply, target, [Change(ADD, 'other', ['iface', 'eth9', 'inet'],
+                                                             ['iface', 'eth9', 'inet', 'dhcp'], None, [])])
+        apply(target, [Change(REMOVE, 'other', ['iface', 'eth9', 'inet'], None, None, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
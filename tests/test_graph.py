@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join
+
+from network_interfaces import InterfacesFile, Iface, DependencyGraph, DependencyCycleError
+from network_interfaces.graph import Edge, BOND, BRIDGE, VLAN, MAP
+
+__author__ = 'vahid'
+
+CONTENT = """
+auto bond0
+iface bond0 inet manual
+  bond-slaves eth0 eth1
+  bond-mode 802.3ad
+
+iface eth2 inet manual
+  bond-master bond0
+
+auto bond0.100
+iface bond0.100 inet manual
+
+auto br0
+iface br0 inet static
+  address 10.0.0.1
+  netmask 255.255.255.0
+  bridge_ports bond0.100 vlan200
+
+source-directory interfaces.d
+"""
+
+VLAN200 = """
+iface vlan200 inet manual
+  vlan-raw-device bond0
+
+mapping eth3
+  script /usr/local/sbin/map-scheme
+  map HOME eth3-home
+"""
+
+
+class GraphCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.mkdir(join(self.temp_dir, 'interfaces.d'))
+        self.filename = join(self.temp_dir, 'interfaces')
+        with open(self.filename, 'w') as f:
+            f.write(CONTENT)
+        with open(join(self.temp_dir, 'interfaces.d', 'vlan200'), 'w') as f:
+            f.write(VLAN200)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_graph(self):
+        graph = DependencyGraph(InterfacesFile(self.filename, lazy=True))
+        self.assertEqual(graph.edges(), [
+            Edge('bond0', 'eth0', BOND), Edge('bond0', 'eth1', BOND), Edge('bond0', 'eth2', BOND),
+            Edge('bond0.100', 'bond0', VLAN), Edge('br0', 'bond0.100', BRIDGE), Edge('br0', 'vlan200', BRIDGE),
+            Edge('eth3', 'eth3-home', MAP), Edge('vlan200', 'bond0', VLAN)])
+        self.assertEqual(graph.nodes, ['bond0', 'bond0.100', 'br0', 'eth0', 'eth1', 'eth2', 'eth3', 'eth3-home',
+                                       'vlan200'])
+        self.assertEqual(graph.order(), ['eth0', 'eth1', 'eth2', 'bond0', 'bond0.100', 'eth3-home', 'eth3',
+                                         'vlan200', 'br0'])
+        self.assertEqual(graph.waves(), [['eth0', 'eth1', 'eth2', 'eth3-home'], ['bond0', 'eth3'],
+                                         ['bond0.100', 'vlan200'], ['br0']])
+        self.assertEqual(graph.dependencies('br0'), ['bond0.100', 'vlan200'])
+        self.assertEqual(graph.dependencies('br0', recursive=True),
+                         ['bond0', 'bond0.100', 'eth0', 'eth1', 'eth2', 'vlan200'])
+        self.assertEqual(graph.dependents('bond0'), ['bond0.100', 'vlan200'])
+        self.assertEqual(graph.dependents('eth0', recursive=True), ['bond0', 'bond0.100', 'br0', 'vlan200'])
+        self.assertEqual(graph.cycles(), [])
+
+    def test_incremental(self):
+        f = InterfacesFile(self.filename)
+        graph = DependencyGraph(f)
+        graph.order()
+        cached = graph._order
+
+        # Not a relation, the cached order is kept.
+        f.get_iface('br0').address = '10.0.0.2'
+        self.assertIs(graph._order, cached)
+
+        f.get_iface('br0').bridge_ports = 'bond0.100'
+        self.assertEqual(graph.dependents('vlan200'), [])
+        self.assertEqual(graph.order(), ['eth0', 'eth1', 'eth2', 'bond0', 'bond0.100', 'br0', 'eth3-home', 'eth3',
+                                         'vlan200'])
+
+        f.get_iface('bond0').bond_slaves = 'eth0 br0'
+        self.assertEqual(graph.cycles(), [['bond0', 'bond0.100', 'br0']])
+        with self.assertRaises(DependencyCycleError) as context:
+            graph.order()
+        self.assertEqual(context.exception.cycles, [['bond0', 'bond0.100', 'br0']])
+        self.assertRaises(DependencyCycleError, graph.waves)
+
+        f.remove_iface('br0')
+        self.assertEqual(graph.cycles(), [])
+        self.assertEqual(graph.dependencies('bond0'), ['br0', 'eth0', 'eth2'])
+        f.get_iface('eth2').name = 'eth4'
+        f.add_iface(Iface(f.filename, 'iface', 'eth0.7', 'inet', 'manual'))
+        self.assertEqual(graph.dependencies('bond0'), ['br0', 'eth0', 'eth4'])
+        self.assertEqual(graph.waves()[-1], ['bond0.100', 'vlan200'])
+        self.assertEqual(graph.dependents('eth0'), ['bond0', 'eth0.7'])
+        self.assertEqual(graph.builds, 1)
+
+        # Reloaded trees are reindexed, the graph is built again.
+        f.reload()
+        self.assertEqual(graph.dependencies('br0'), ['bond0.100', 'vlan200'])
+
+        graph.close()
+        f.get_iface('br0').bridge_ports = 'eth0'
+        self.assertEqual(graph.dependencies('br0'), ['bond0.100', 'vlan200'])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join
+
+from network_interfaces import InterfacesFile, Instrumentation, IncludeCycleError, iter_stanzas
+
+__author__ = 'vahid'
+
+
+class IncludeCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.mkdir(join(self.temp_dir, 'interfaces.d'))
+        self.filename = join(self.temp_dir, 'interfaces')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, filename, content):
+        with open(join(self.temp_dir, filename), 'w') as f:
+            f.write(content)
+
+    def test_shared(self):
+        self.write('interfaces', 'source interfaces.d/*\nsource-directory interfaces.d\nsource common\n')
+        self.write('interfaces.d/eth0', 'iface eth0 inet dhcp\n\nsource ../common\n')
+        self.write('interfaces.d/eth1', 'iface eth1 inet manual\n')
+        self.write('common', 'auto lo\niface lo inet loopback\n')
+
+        instrument = Instrumentation()
+        f = InterfacesFile(self.filename, instrument=instrument)
+        self.assertEqual(instrument.counters['files_opened'], 4)
+        self.assertEqual([x.filename for x in f.iter_files()],
+                         [self.filename, 'interfaces.d/eth0', '../common', 'interfaces.d/eth1'])
+
+        eth0 = f.sub_files[0]
+        self.assertEqual([x.filename for x in f.includes], ['interfaces.d/eth0', 'interfaces.d/eth1', '../common'])
+        self.assertIs(f.includes[2], eth0.includes[0])
+        self.assertEqual(f.get_iface('lo').startup.mode, 'auto')
+
+        # Written once, through its first includer.
+        self.assertEqual(len(f.save(recursive=True)), 4)
+        f.get_iface('lo').startup = None
+        self.assertEqual(f.save(recursive=True), [join(self.temp_dir, 'common')])
+
+        stanzas = list(iter_stanzas(self.filename, follow_sources=True))
+        self.assertEqual([s.name for s in stanzas if hasattr(s, 'name')], ['eth0', 'lo', 'eth1'])
+
+    def test_cycle(self):
+        self.write('interfaces', 'iface eth0 inet dhcp\n\nsource-directory interfaces.d\n')
+        self.write('interfaces.d/eth1', 'iface eth1 inet dhcp\n\nsource ../more\n')
+        self.write('more', 'source interfaces\n')
+
+        cycle = [self.filename, join(self.temp_dir, 'interfaces.d', 'eth1'), join(self.temp_dir, 'more'),
+                 self.filename]
+        with self.assertRaises(IncludeCycleError) as context:
+            InterfacesFile(self.filename)
+        self.assertEqual(context.exception.cycle, cycle)
+
+        f = InterfacesFile(self.filename, lazy=True)
+        self.assertRaises(IncludeCycleError, list, f.iter_files())
+
+        with self.assertRaises(IncludeCycleError) as context:
+            list(iter_stanzas(self.filename, follow_sources=True))
+        self.assertEqual(context.exception.cycle, cycle)
+
+        self.write('more', 'source more\n')
+        self.assertRaises(IncludeCycleError, InterfacesFile, self.filename)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Instrumentation, ParseCache
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class InstrumentationCase(unittest.TestCase):
+
+    def test_counters(self):
+        events = []
+        instrument = Instrumentation()
+        instrument.add_hook(lambda kind, name, value: events.append((kind, name)))
+
+        f = InterfacesFile(join(data_dir, 'interfaces_two'), instrument=instrument)
+        f.get_iface('eth1')
+        f.as_string()
+
+        counters = instrument.snapshot()['counters']
+        self.assertEqual(counters['files_opened'], 5)
+        self.assertEqual(counters['listdir_calls'], 1)
+        self.assertEqual(counters['stanzas_parsed'], 15)
+        self.assertGreater(counters['bytes_read'], 0)
+        self.assertGreater(counters['lines_read'], counters['stanzas_parsed'])
+        self.assertGreaterEqual(counters['lookups'], 1)
+        for name in ('read', 'tokenize', 'materialize', 'bind_startups', 'render'):
+            self.assertIn(name, instrument.timers)
+        self.assertIn(('count', 'lookups'), events)
+        self.assertIn(('time', 'render'), events)
+
+        instrument.reset()
+        self.assertEqual(instrument.snapshot(), {'counters': {}, 'timers': {}})
+
+    def test_listdir_calls(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        os.mkdir(join(temp_dir, 'a.d'))
+        os.mkdir(join(temp_dir, 'b.d'))
+        filename = join(temp_dir, 'interfaces')
+        with open(filename, 'w') as f:
+            f.write('source a.d/*\nsource-directory b.d\nsource-directory b.d\n')
+
+        instrument = Instrumentation()
+        cache = ParseCache()
+        InterfacesFile(filename, cache=cache, instrument=instrument)
+        # The glob and the first source-directory scan, the second one reuses the listing.
+        self.assertEqual(instrument.counters['listdir_calls'], 2)
+        self.assertEqual(instrument.counters['glob_calls'], 1)
+
+        InterfacesFile(filename, cache=cache, instrument=instrument)
+        self.assertEqual(instrument.counters['listdir_calls'], 2)
+
+    def test_cache_and_write(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            instrument = Instrumentation()
+            cache = ParseCache()
+            filename = join(data_dir, 'interfaces_three')
+            InterfacesFile(filename, cache=cache, instrument=instrument)
+            f = InterfacesFile(filename, cache=cache, instrument=instrument)
+            os.mkdir(join(temp_dir, 'interfaces.d'))
+            self.assertEqual(instrument.counters['cache_misses'], 5)
+            self.assertEqual(instrument.counters['cache_hits'], 5)
+
+            f.save(recursive=True, filename=join(temp_dir, 'interfaces'))
+            self.assertEqual(instrument.counters['files_written'], 5)
+            self.assertGreater(instrument.counters['bytes_written'], 0)
+            self.assertIn('write', instrument.timers)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
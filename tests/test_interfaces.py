@@ -3,7 +3,9 @@ import unittest
 import tempfile
 from os.path import join, dirname, abspath
 import os
-from network_interfaces import InterfacesFile, Auto, Allow, ValidationError
+import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from network_interfaces import InterfacesFile, Iface, Auto, Allow, ValidationError
 
 __author__ = 'vahid'
 
@@ -18,8 +20,8 @@ class NetworkingCase(unittest.TestCase):
         self.interfaces_filename_two = join(data_dir, 'interfaces_two')
         self.interfaces_filename_three = join(data_dir, 'interfaces_three')
 
-    def checkup_interfaces_file(self, filename):
-        f = InterfacesFile(filename)
+    def checkup_interfaces_file(self, filename, **kwargs):
+        f = InterfacesFile(filename, **kwargs)
 
         self.assertRaises(KeyError, f.get_iface, 'non-existance-iface')
 
@@ -147,25 +149,156 @@ class NetworkingCase(unittest.TestCase):
         self.assertRaises(AttributeError, lambda: self.netmask)
         #print eth0.netmask
 
-    def test_validate(self):
-        f1 = InterfacesFile(self.interfaces_filename_one)
-        eth0 = f1.get_iface('eth0')
-        self.assertTrue(eth0.validate())
+    def test_index(self):
+        f = InterfacesFile(self.interfaces_filename_two)
+        self.assertIn('eth1', f)
+        self.assertNotIn('eth9', f)
 
-        # commented due lack of feature.
-        # del eth0.network
-        # self.assertRaises(ValidationError, eth0.validate)
-        # self.assertTrue(eth0.validate(allow_correction=True))
+        eth1 = f.get_iface('eth1')
+        sub_file = eth1._owner
+        self.assertIsNot(sub_file, f)
+        self.assertIs(sub_file.get_iface('eth1'), eth1)
+        self.assertRaises(KeyError, sub_file.get_iface, 'eth0')
+
+        eth1.name = 'eth9'
+        self.assertRaises(KeyError, f.get_iface, 'eth1')
+        self.assertIs(f.get_iface('eth9'), eth1)
+
+        self.assertRaises(KeyError, f.add_iface, Iface(f.filename, 'iface', 'eth0', 'inet', 'dhcp'))
+        eth3 = Iface(f.filename, 'iface', 'eth3', 'inet', 'dhcp')
+        f.add_iface(eth3)
+        self.assertIs(f.get_iface('eth3'), eth3)
+
+        f.remove_iface('eth9')
+        self.assertNotIn('eth9', f)
+        self.assertNotIn(eth1, sub_file.interfaces)
+        self.assertRaises(KeyError, f.remove_iface, 'eth9')
+
+    def test_index_order(self):
+        # A stanza added to the root file shadows the one of a sub-file, as in a lazy tree.
+        for lazy in (False, True):
+            f = InterfacesFile(self.interfaces_filename_two, lazy=lazy)
+            eth1 = f.get_iface('eth1')
+            sub_file = eth1._owner
+            self.assertIsNot(sub_file, f)
+            root_eth1 = Iface(f.filename, 'iface', 'eth1', 'inet', 'dhcp')
+            f.add_iface(root_eth1)
+            self.assertIs(f.get_iface('eth1'), root_eth1)
+            self.assertIs(sub_file.get_iface('eth1'), eth1)
+
+            eth1.name = 'eth8'
+            eth1.name = 'eth1'
+            self.assertIs(f.get_iface('eth1'), root_eth1)
+
+    def test_lazy(self):
+        f = InterfacesFile(self.interfaces_filename_two, lazy=True)
+        self.assertIsNone(f._sub_files)
+        self.assertEqual(f.get_iface('eth0').startup.mode, 'auto')
+        self.assertIsNone(f._sub_files)
+
+        eth1 = f.get_iface('eth1')
+        self.assertIsNotNone(f._sub_files)
+        self.assertEqual(eth1.startup.mode, 'auto')
+        self.assertEqual(f.get_iface('lo').startup.mode, 'auto')
+
+        self.checkup_interfaces_file(self.interfaces_filename_two, lazy=True)
+        self.checkup_interfaces_file(self.interfaces_filename_three, lazy=True)
+        self.assertEqual(
+            hash(InterfacesFile(self.interfaces_filename_two)),
+            hash(InterfacesFile(self.interfaces_filename_two, lazy=True)))
+
+    def test_parallel(self):
+        serial = InterfacesFile(self.interfaces_filename_two)
+        for executor_type in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with executor_type(max_workers=2) as executor:
+                f = self.checkup_interfaces_file(self.interfaces_filename_two, executor=executor)
+                self.assertEqual([s.filename for s in f.sub_files], [s.filename for s in serial.sub_files])
+                self.assertEqual(f.digest(recursive=True), serial.digest(recursive=True))
 
-        # del eth0.netmask
-        # self.assertRaises(ValidationError, eth0.validate)
-        # self.assertTrue(eth0.validate(allow_correction=True))
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        filename = join(temp_dir, 'interfaces')
+        with open(filename, 'w') as f:
+            f.write('source missing\nsource %s\n' % join(data_dir, 'loopback'))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertRaises(FileNotFoundError, InterfacesFile, filename, executor=executor)
+
+    def test_hash(self):
+        f1 = InterfacesFile(self.interfaces_filename_three)
+        f2 = InterfacesFile(self.interfaces_filename_three)
+        h = hash(f1)
+        d = f1.digest(recursive=True)
+        self.assertEqual(f1.digest(recursive=True), f2.digest(recursive=True))
+        self.assertEqual(len(f1.digest()), 32)
 
-        # eth0.address = '192.168.90.3'
-        # self.assertRaises(ValidationError, eth0.validate)
+        eth0 = f1.get_iface('eth0')
+        eth0.mtu = '9000'
+        self.assertNotEqual(hash(f1), h)
+        self.assertNotEqual(f1.digest(recursive=True), d)
+        cached = hash(f1)
+        f1._hash = None
+        self.assertEqual(hash(f1), cached)
+
+        del eth0.mtu
+        self.assertEqual(hash(f1), h)
+        self.assertEqual(f1.digest(recursive=True), d)
+
+        eth1 = f1.get_iface('eth1')
+        eth1.method = 'manual'
+        self.assertNotEqual(f1.digest(recursive=True), d)
+        self.assertEqual(f1.digest(), f2.digest())
+
+        f1.add_iface(Iface(f1.filename, 'iface', 'eth5', 'inet', 'manual'))
+        f1.remove_iface('eth5')
+        self.assertEqual(hash(f1), h)
 
+    def test_validate(self):
+        f1 = InterfacesFile(self.interfaces_filename_one)
+        eth0 = f1.get_iface('eth0')
+        self.assertTrue(eth0.validate())
 
+        # The network is optional.
+        del eth0.network
+        self.assertTrue(eth0.validate())
+        eth0.network = '192.168.11.0'
 
+        del eth0.netmask
+        self.assertRaises(ValidationError, eth0.validate)
+        self.assertTrue(eth0.validate(allow_correction=True))
+        self.assertEqual(eth0.netmask, '255.255.255.240')
+
+        eth0.address = '192.168.90.3'
+        self.assertRaises(ValidationError, eth0.validate)
+        self.assertTrue(eth0.validate(allow_correction=True))
+        self.assertEqual((eth0.network, eth0.broadcast), ('192.168.90.0', '192.168.90.15'))
+
+        self.assertTrue(f1.validate(recursive=True))
+        eth0.mtu = 'big'
+        f1.get_iface('wlan1').address = '10.0.0.1'
+        f1.get_iface('eth1').method = 'bogus'
+        del f1.get_iface('eth2').script
+        with self.assertRaises(ValidationError) as ctx:
+            f1.save(recursive=True)
+        self.assertEqual(sorted((e.name, e.option) for e in ctx.exception.errors),
+                         [('eth0', 'mtu'), ('eth1', None), ('eth2', 'script')])
+
+        # The address of a dhcp interface is only rejected by the strict validation.
+        with self.assertRaises(ValidationError) as ctx:
+            f1.validate(recursive=True, strict=True)
+        self.assertIn(('wlan1', 'address'), [(e.name, e.option) for e in ctx.exception.errors])
+
+    def test_validate_manual_address(self):
+        # Used by ifupdown2, ignored by ifupdown.
+        eth1 = Iface('interfaces', 'iface', 'eth1', 'inet', 'manual')
+        eth1.address = '10.0.0.1/24'
+        self.assertTrue(eth1.validate())
+        self.assertRaises(ValidationError, eth1.validate, strict=True)
+
+    def test_validation_error(self):
+        error = ValidationError('bad netmask')
+        self.assertEqual(str(error), 'bad netmask')
+        self.assertEqual(error.errors, [])
+        self.assertEqual(str(ValidationError()), '')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Iface, Auto
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+CONTENT = """# Managed by hand.
+
+auto lo
+iface lo inet loopback
+
+# Uplink
+auto eth0
+iface eth0 inet static
+    address    10.0.0.2
+    # netmask below
+    netmask 255.255.255.0
+
+  gateway 10.0.0.1
+allow-hotplug wlan0
+iface wlan0 inet dhcp
+\twpa-ssid "home net"
+
+source-directory interfaces.d
+# trailing comment"""
+
+
+class LosslessCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.filename = join(self.data_dir, 'interfaces')
+        with open(self.filename, 'w') as f:
+            f.write(CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _read(self):
+        with open(self.filename) as f:
+            return f.read()
+
+    def test_round_trip(self):
+        f = InterfacesFile(self.filename, lossless=True)
+        self.assertEqual(f.as_string(), CONTENT)
+        self.assertEqual(f.get_iface('eth0').gateway, '10.0.0.1')
+        self.assertEqual(f.get_iface('wlan0').startup.mode, 'allow-hotplug')
+        self.assertEqual(f.save(recursive=True), [])
+
+        for name in ('interfaces_one', 'interfaces_two', 'interfaces_three'):
+            filename = join(self.data_dir, name)
+            with open(filename) as content:
+                self.assertEqual(InterfacesFile(filename, lossless=True).as_string(), content.read())
+
+    def test_edit(self):
+        f = InterfacesFile(self.filename, lossless=True)
+        f.get_iface('wlan0').method = 'manual'
+        f.remove_iface('lo')
+        iface = Iface(self.filename, 'iface', 'eth5', 'inet', 'manual')
+        iface.startup = Auto(self.filename, 'auto', 'eth5')
+        f.add_iface(iface)
+        self.assertEqual(f.save(), [self.filename])
+
+        expected = CONTENT.replace('auto lo\niface lo inet loopback\n', '').replace(
+            'iface wlan0 inet dhcp\n', 'iface wlan0 inet manual\n')
+        self.assertEqual(self._read(), expected + '\n\nauto eth5\niface eth5 inet manual\n')
+
+        f.get_iface('eth0').startup = None
+        f.save()
+        self.assertNotIn('auto eth0', self._read())
+        self.assertIn('    address    10.0.0.2\n', self._read())
+
+    def test_edit_options(self):
+        f = InterfacesFile(self.filename, lossless=True)
+        eth0 = f.get_iface('eth0')
+        eth0.netmask = '255.255.0.0'
+        eth0.mtu = '9000'
+        del eth0.gateway
+        f.save()
+
+        # Only the changed lines are rendered, the comment and the indentation of the others are kept.
+        expected = CONTENT.replace(
+            '    netmask 255.255.255.0\n\n  gateway 10.0.0.1\n', '    netmask 255.255.0.0\n\n    mtu 9000\n')
+        self.assertEqual(self._read(), expected)
+
+        f = InterfacesFile(self.filename, lossless=True)
+        f.get_iface('eth0').address = '10.0.0.3'
+        f.save()
+        self.assertEqual(self._read(), expected.replace('address    10.0.0.2', 'address 10.0.0.3'))
+
+    def test_reload(self):
+        f = InterfacesFile(self.filename, lossless=True)
+        eth0 = f.get_iface('eth0')
+        with open(self.filename, 'w') as content:
+            content.write(CONTENT.replace('10.0.0.1', '10.0.0.254'))
+        f.reload()
+        self.assertIs(f.get_iface('eth0'), eth0)
+        self.assertEqual(eth0.gateway, '10.0.0.254')
+        self.assertEqual(f.as_string(), CONTENT.replace('10.0.0.1', '10.0.0.254'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import Iface, Mapping, Auto, Allow, Source, SourceDirectory
+from network_interfaces.parser import tokenize, tokenize_bytes, read_records, parse, iter_stanzas
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class ParserCase(unittest.TestCase):
+
+    def test_tokenize(self):
+        lines = [
+            '# comment',
+            '',
+            'auto eth0',
+            'iface eth0 inet6 auto',
+            '  autoconf 1',
+            '  # inner comment',
+            '  wpa-ssid "my network"',
+            'source-directory interfaces.d',
+        ]
+        self.assertEqual(list(tokenize(lines)), [
+            (['auto', 'eth0'], []),
+            (['iface', 'eth0', 'inet6', 'auto'], [['autoconf', '1'], ['wpa-ssid', 'my', 'network']]),
+            (['source-directory', 'interfaces.d'], []),
+        ])
+
+    def test_dispatch(self):
+        lines = [
+            'allow-hotplug wlan0',
+            'auto eth0',
+            'iface eth0 inet dhcp',
+            'mapping eth1',
+            '  script /bin/true',
+            'source loopback',
+            'source-directory interfaces.d',
+        ]
+        self.assertEqual(
+            [type(s) for s in parse(lines, 'interfaces')],
+            [Allow, Auto, Iface, Mapping, Source, SourceDirectory])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, list, tokenize(['  address 10.0.0.1']))
+        self.assertRaises(ValueError, list, parse(['auto eth0', '  address 10.0.0.1']))
+
+    def test_tokenize_bytes(self):
+        lines = [
+            '# comment',
+            '',
+            'auto eth0',
+            'iface eth0 inet6 auto',
+            '  autoconf 1',
+            '\t# inner comment',
+            '  wpa-ssid "my network"\r',
+            '  autoconf 1',
+            'source-directory interfaces.d',
+        ]
+        data = '\n'.join(lines).encode()
+        self.assertEqual(list(tokenize_bytes(data)), list(tokenize(lines)))
+        self.assertEqual(list(tokenize_bytes(b'')), [])
+
+        with self.assertRaises(ValueError) as context:
+            list(tokenize_bytes(b'# comment\n\n  address 10.0.0.1\n', 'interfaces'))
+        self.assertEqual(str(context.exception), 'interfaces:3: option outside of a stanza: address 10.0.0.1')
+
+    def test_tokenize_bytes_empty_cells(self):
+        # A no-break space is not whitespace for the bytes regex, but the line has no cells.
+        lines = ['auto eth0', '\u00a0', 'iface eth0 inet dhcp', '\u00a0', '  hostname box', '\u00a0']
+        data = '\n'.join(lines).encode()
+        self.assertEqual(list(tokenize_bytes(data)), list(tokenize(lines)))
+
+    def test_read_records(self):
+        filename = join(data_dir, 'interfaces_one')
+        with open(filename) as f:
+            self.assertEqual(read_records(filename), list(tokenize(f, filename)))
+
+    def test_iter_stanzas(self):
+        filename = join(data_dir, 'interfaces_three')
+        stanzas = iter_stanzas(filename)
+        self.assertIsInstance(next(stanzas), Auto)
+        self.assertEqual([repr(s) for s in stanzas][-3:], [
+            'source interfaces.d/wlan1', 'source interfaces.d/eth2', 'source interfaces.d/eth1'])
+
+        names = [s.name for s in iter_stanzas(filename, follow_sources=True) if isinstance(s, (Iface, Mapping))]
+        self.assertEqual(names, ['eth0', 'wlan0', 'lo', 'wlan1', 'eth2-home', 'eth2', 'eth1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Iface, Auto
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+def names(stanzas):
+    return sorted(s.name for s in stanzas)
+
+
+class QueryCase(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = join(data_dir, 'interfaces_one')
+
+    def test_find_iface(self):
+        f = InterfacesFile(self.filename)
+        self.assertEqual(names(f.find_iface('eth')), ['eth0', 'eth1', 'eth2-home'])
+        self.assertEqual(names(f.find_iface('0')), ['eth0', 'wlan0'])
+        self.assertEqual(f.find_iface('missing'), [])
+        self.assertEqual(f.find_iface('*'), [])
+
+    def test_query(self):
+        f = InterfacesFile(self.filename, indexes=('name', 'address_family', 'method', 'startup', 'wpa-ssid'))
+        self.assertEqual(names(f.query(method='static', startup='auto')), ['eth0'])
+        self.assertEqual(names(f.query(address_family='inet', startup=None)), ['eth2-home'])
+        self.assertEqual(names(f.query(name='wlan*')), ['wlan0', 'wlan1'])
+        self.assertEqual(names(f.query(name='eth?')), ['eth0', 'eth1', 'eth2'])
+        self.assertEqual(names(f.query(name='lo')), ['lo'])
+        self.assertEqual(names(f.query(wpa_ssid='khayyam')), ['wlan0'])
+        self.assertEqual(names(f.query(address=lambda v: v is not None and v.startswith('192.168.1.'))),
+                         ['eth2-home'])
+        self.assertEqual(names(f.query(name='*', startup='allow-hotplug')), ['wlan0'])
+
+        # A sub-file only queries its own stanzas.
+        sub_file = f.get_iface('eth1')._owner.parent.sub_files[-1]
+        self.assertEqual(names(sub_file.query(method='dhcp')), ['wlan1'])
+
+        # The same results without indexes.
+        plain = InterfacesFile(self.filename, indexes=())
+        for criteria in ({'method': 'static', 'startup': 'auto'}, {'name': 'wlan*'}, {'wpa_ssid': 'khayyam'}):
+            self.assertEqual(names(plain.query(**criteria)), names(f.query(**criteria)))
+        self.assertEqual(plain._tree.indexes.builds, 0)
+
+    def test_indexes_updated(self):
+        f = InterfacesFile(self.filename)
+        self.assertEqual(names(f.query(method='dhcp')), ['eth1', 'wlan1'])
+        self.assertEqual(names(f.query(name='eth*')), ['eth0', 'eth1', 'eth2', 'eth2-home'])
+        builds = f._tree.indexes.builds
+
+        f.get_iface('eth1').method = 'static'
+        f.get_iface('wlan0').startup = Auto(f.filename, 'auto', 'wlan0')
+        f.get_iface('eth2-home').name = 'home'
+        eth3 = Iface(f.filename, 'iface', 'eth3', 'inet', 'dhcp')
+        f.add_iface(eth3)
+        f.remove_iface('wlan1')
+
+        self.assertEqual(names(f.query(method='dhcp')), ['eth3'])
+        self.assertEqual(names(f.query(startup='auto')), ['eth0', 'eth1', 'eth2', 'lo', 'wlan0'])
+        self.assertEqual(names(f.query(name='eth*')), ['eth0', 'eth1', 'eth2', 'eth3'])
+        self.assertEqual(names(f.query(name='h*')), ['home'])
+        self.assertEqual(names(f.query(name='wlan*')), ['wlan0'])
+        self.assertEqual(f._tree.indexes.builds, builds + 1)
+
+    def test_lazy(self):
+        f = InterfacesFile(self.filename, lazy=True)
+        self.assertEqual(names(f.query(method='dhcp')), ['eth1', 'wlan1'])
+        self.assertEqual(f._tree.pending, 0)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from os.path import join, dirname, abspath, exists
+
+from network_interfaces import InterfacesFile, RollbackError
+from network_interfaces import storage
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class SaveCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.filename = join(self.data_dir, 'interfaces_three')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_incremental_save(self):
+        f = InterfacesFile(self.filename)
+        self.assertEqual(f.save(recursive=True), [])
+        self.assertFalse(exists(self.filename + '.back'))
+
+        f.get_iface('eth1').hostname = 'box'
+        eth1_filename = join(self.data_dir, 'interfaces.d', 'eth1')
+        self.assertTrue(f.get_iface('eth1')._owner.dirty)
+        self.assertEqual(f.save(recursive=True), [eth1_filename])
+        self.assertTrue(exists(eth1_filename + '.back'))
+        self.assertEqual(f.save(recursive=True), [])
+
+        self.assertEqual(InterfacesFile(self.filename).get_iface('eth1').hostname, 'box')
+
+    def test_external_change(self):
+        f = InterfacesFile(self.filename)
+        f.save(recursive=True)
+
+        with open(self.filename, 'a') as handle:
+            handle.write('\nsource extra\n')
+        st = os.stat(self.filename)
+        os.utime(self.filename, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        self.assertEqual(f.save(), [self.filename])
+
+    def test_structural_change(self):
+        f = InterfacesFile(self.filename)
+        f.save()
+        del f.sources[0]
+        self.assertEqual(f.save(), [self.filename])
+
+    def test_nested_sources(self):
+        # Each sourced file is relative to the directory of its includer, not to the current directory.
+        nested = join(self.temp_dir, 'nested')
+        os.makedirs(join(nested, 'a', 'b'))
+        for filename, content in (('interfaces', 'source a/first\n'), ('a/first', 'source b/second\n'),
+                                  ('a/b/second', 'iface eth9 inet dhcp\n')):
+            with open(join(nested, filename), 'w') as handle:
+                handle.write(content)
+
+        cwd = os.getcwd()
+        os.chdir(self.data_dir)
+        self.addCleanup(os.chdir, cwd)
+        f = InterfacesFile(join(nested, 'interfaces'))
+        second = join(nested, 'a', 'b', 'second')
+        self.assertEqual([x.absolute_filename for x in f.iter_files()],
+                         [join(nested, 'interfaces'), join(nested, 'a', 'first'), second])
+
+        self.assertEqual(len(f.save(recursive=True)), 3)
+        f.get_iface('eth9').hostname = 'box'
+        self.assertEqual(f.save(recursive=True), [second])
+        self.assertFalse(exists(join(self.data_dir, 'b', 'second')))
+
+    def test_rootdir(self):
+        host = join(self.temp_dir, 'host')
+        os.makedirs(join(host, 'etc', 'network', 'interfaces.d'))
+        filename = join(host, 'etc', 'network', 'interfaces')
+        eth0_filename = join(host, 'etc', 'network', 'interfaces.d', 'eth0')
+        with open(filename, 'w') as f:
+            f.write('source /etc/network/interfaces.d/*\n')
+        with open(eth0_filename, 'w') as f:
+            f.write('iface eth0 inet dhcp\n')
+
+        f = InterfacesFile(filename, rootdir=host)
+        self.assertEqual(len(f.save(recursive=True)), 2)
+        f.get_iface('eth0').hostname = 'box'
+        # Written under the root directory, where it was read, not to the /etc of this host.
+        self.assertEqual(f.save(recursive=True), [eth0_filename])
+        self.assertEqual(InterfacesFile(filename, rootdir=host).get_iface('eth0').hostname, 'box')
+        self.assertEqual(f.save(recursive=True), [])
+
+    def test_symlink(self):
+        real = join(self.temp_dir, 'real')
+        link = join(self.temp_dir, 'interfaces')
+        with open(real, 'w') as f:
+            f.write('old')
+        os.symlink(real, link)
+
+        storage.commit([(link, 'new', '.back')])
+        self.assertTrue(os.path.islink(link))
+        with open(real) as f:
+            self.assertEqual(f.read(), 'new')
+        with open(link + '.back') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['data', 'interfaces', 'interfaces.back', 'real'])
+
+    def test_atomic_commit(self):
+        first = join(self.temp_dir, 'first')
+        second = join(self.temp_dir, 'second')
+        with open(first, 'w') as f:
+            f.write('old')
+        os.chmod(first, 0o640)
+
+        storage.commit([(first, 'new', ''), (second, 'created', '.back')])
+        with open(first) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.stat(first).st_mode & 0o777, 0o640)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['data', 'first', 'second'])
+
+    def test_rollback(self):
+        f = InterfacesFile(self.filename)
+        f.get_iface('eth0').address = '10.0.0.1'
+        f.get_iface('eth1').hostname = 'box'
+        eth1_filename = join(self.data_dir, 'interfaces.d', 'eth1')
+        with open(self.filename) as handle:
+            original = handle.read()
+
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if dst == eth1_filename:
+                raise OSError('disk full')
+            return real_replace(src, dst)
+
+        with mock.patch('os.replace', side_effect=replace):
+            self.assertRaises(OSError, f.save, recursive=True)
+
+        with open(self.filename) as handle:
+            self.assertEqual(handle.read(), original)
+        self.assertTrue(f.dirty)
+        self.assertFalse([n for n in os.listdir(join(self.data_dir, 'interfaces.d')) if n.endswith('.tmp')])
+
+        self.assertEqual(f.save(recursive=True), [self.filename, eth1_filename])
+
+    def _failing_commit(self):
+        first = join(self.temp_dir, 'first')
+        second = join(self.temp_dir, 'second')
+        for filename in (first, first + '.back', second):
+            with open(filename, 'w') as f:
+                f.write('old ' + filename)
+
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if dst == second:
+                raise OSError('disk full')
+            return real_replace(src, dst)
+
+        with mock.patch('os.replace', side_effect=replace):
+            storage.commit([(first, 'new', '.back'), (second, 'new', '.back')])
+
+    def test_rollback_keeps_backup(self):
+        first = join(self.temp_dir, 'first')
+        self.assertRaises(OSError, self._failing_commit)
+        # The backup is only written by a successful commit.
+        with open(first + '.back') as f:
+            self.assertEqual(f.read(), 'old ' + first + '.back')
+        with open(first) as f:
+            self.assertEqual(f.read(), 'old ' + first)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['data', 'first', 'first.back', 'second'])
+
+        storage.commit([(first, 'new', '.back')])
+        with open(first + '.back') as f:
+            self.assertEqual(f.read(), 'old ' + first)
+        self.assertFalse(exists(first + storage.ROLLBACK_SUFFIX))
+
+    def test_failed_restore(self):
+        first = join(self.temp_dir, 'first')
+        with mock.patch('network_interfaces.storage._restore', side_effect=OSError('read-only')):
+            with self.assertRaises(RollbackError) as context:
+                self._failing_commit()
+        rollback_filename = first + storage.ROLLBACK_SUFFIX
+        self.assertEqual([f[:2] for f in context.exception.failures], [(first, rollback_filename)])
+        self.assertIsInstance(context.exception.__cause__, OSError)
+        # The only copy of the original content is kept.
+        with open(rollback_filename) as f:
+            self.assertEqual(f.read(), 'old ' + first)
+        self.assertFalse(exists(join(self.temp_dir, 'second' + storage.ROLLBACK_SUFFIX)))
+
+
+if __name__ == '__main__':
+    unittest.main()
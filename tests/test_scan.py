@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, ParseCache
+from network_interfaces.scan import DirectoryScanner
+from network_interfaces.source import SOURCE_DIRECTORY_PATTERN
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class ScanCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.sub_dir = join(self.data_dir, 'interfaces.d')
+        for name in ('eth1.back', 'eth1.rollback', 'eth1.orig', '.hidden', 'eth9.cfg'):
+            with open(join(self.sub_dir, name), 'w') as f:
+                f.write('iface %s inet manual\n' % name.replace('.', '_'))
+        os.mkdir(join(self.sub_dir, 'subdir'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_files(self):
+        scanner = DirectoryScanner()
+        self.assertEqual(scanner.files(self.sub_dir, SOURCE_DIRECTORY_PATTERN), ['eth1', 'eth2', 'wlan1'])
+        self.assertEqual(scanner.files(self.sub_dir, ignore=('.orig',)),
+                         ['.hidden', 'eth1', 'eth2', 'eth9.cfg', 'wlan1'])
+        self.assertEqual(scanner.scans, 1)
+
+        with open(join(self.sub_dir, 'eth3'), 'w'):
+            pass
+        st = os.stat(self.sub_dir)
+        os.utime(self.sub_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertIn('eth3', scanner.files(self.sub_dir))
+        self.assertEqual(scanner.scans, 2)
+
+    def test_glob(self):
+        scanner = DirectoryScanner()
+        self.assertEqual(scanner.glob('interfaces.d/*', self.data_dir, ('.orig',)),
+                         ['interfaces.d/eth1', 'interfaces.d/eth2', 'interfaces.d/eth9.cfg', 'interfaces.d/wlan1'])
+        self.assertEqual(scanner.glob('interfaces.d/*.cfg', self.data_dir), ['interfaces.d/eth9.cfg'])
+        self.assertEqual(scanner.glob('%s/eth?' % self.sub_dir, self.data_dir),
+                         [join(self.sub_dir, 'eth1'), join(self.sub_dir, 'eth2')])
+        self.assertEqual(scanner.glob('missing/*', self.data_dir), [])
+        self.assertEqual(scanner.glob('*.d/eth1', self.data_dir), ['interfaces.d/eth1'])
+
+    def test_interfaces_file(self):
+        filename = join(self.data_dir, 'interfaces')
+        with open(filename, 'w') as f:
+            f.write('source interfaces.d/*\n')
+
+        cache = ParseCache()
+        f = InterfacesFile(filename, backup='.orig', cache=cache)
+        self.assertEqual([s.filename for s in f.sub_files],
+                         ['interfaces.d/eth1', 'interfaces.d/eth2', 'interfaces.d/eth9.cfg', 'interfaces.d/wlan1'])
+        InterfacesFile(filename, backup='.orig', cache=cache)
+        self.assertEqual(cache.scanner.scans, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
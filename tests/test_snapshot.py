@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Snapshot, write_snapshot
+from network_interfaces.snapshot import snapshot_filename
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+class SnapshotCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.filename = join(self.data_dir, 'interfaces_two')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_snapshot(self):
+        f = InterfacesFile(self.filename)
+        filename = write_snapshot(f)
+        self.assertEqual(filename, join(self.data_dir, '.interfaces_two.snapshot'))
+        self.assertEqual(snapshot_filename(self.filename), filename)
+
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(len(snapshot), 5)
+            self.assertIn(self.filename, snapshot)
+            loaded = InterfacesFile(self.filename, cache=snapshot)
+            self.assertEqual((snapshot.hits, snapshot.misses), (5, 0))
+            # The listings of the snapshot are used, the directory is not scanned.
+            self.assertEqual(snapshot.scanner.scans, 0)
+        self.assertEqual(loaded.digest(recursive=True), f.digest(recursive=True))
+        self.assertEqual(loaded.get_iface('wlan0').startup.mode, 'allow-hotplug')
+        self.assertEqual(loaded.get_iface('eth1').startup.mode, 'auto')
+
+    def test_lazy(self):
+        write_snapshot(InterfacesFile(self.filename))
+        with Snapshot(snapshot_filename(self.filename)) as snapshot:
+            f = InterfacesFile(self.filename, cache=snapshot, lazy=True)
+            self.assertEqual(f.get_iface('eth0').method, 'static')
+            self.assertEqual(snapshot.hits, 1)
+            self.assertEqual(f.get_iface('lo').method, 'loopback')
+            self.assertEqual(snapshot.hits, 5)
+
+    def test_stale(self):
+        write_snapshot(InterfacesFile(self.filename))
+        with open(join(self.data_dir, 'interfaces.d', 'eth1'), 'a') as f:
+            f.write('  hostname box\n')
+        with open(join(self.data_dir, 'interfaces.d', 'eth3'), 'w') as f:
+            f.write('iface eth3 inet dhcp\n')
+
+        for digest in (False, True):
+            with Snapshot(snapshot_filename(self.filename), digest=digest) as snapshot:
+                f = InterfacesFile(self.filename, cache=snapshot)
+                self.assertEqual((snapshot.hits, snapshot.misses), (4, 2))
+                self.assertEqual(f.get_iface('eth1').hostname, 'box')
+                self.assertEqual(f.get_iface('eth3').method, 'dhcp')
+
+        write_snapshot(f)
+        with Snapshot(snapshot_filename(self.filename)) as snapshot:
+            InterfacesFile(self.filename, cache=snapshot)
+            self.assertEqual((snapshot.hits, snapshot.misses), (6, 0))
+
+    def test_invalid(self):
+        filename = snapshot_filename(self.filename)
+        for content in (b'', b'not a snapshot' * 10):
+            with open(filename, 'wb') as f:
+                f.write(content)
+            with Snapshot(filename) as snapshot:
+                self.assertEqual(len(snapshot), 0)
+                f = InterfacesFile(self.filename, cache=snapshot)
+                self.assertEqual((snapshot.hits, snapshot.misses), (0, 5))
+                self.assertEqual(f.get_iface('eth0').method, 'static')
+        os.unlink(filename)
+        self.assertEqual(len(Snapshot(filename)), 0)
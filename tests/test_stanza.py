@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import pickle
+import unittest
+
+from network_interfaces import Iface, Mapping
+from network_interfaces.serializer import render_stanza
+
+__author__ = 'vahid'
+
+
+class StanzaCase(unittest.TestCase):
+
+    def setUp(self):
+        self.iface = Iface('interfaces', 'iface', 'br0', 'inet', 'static')
+        for line in ('address 10.0.0.1', 'up ip route add default via 10.0.0.254', 'netmask 255.255.255.0',
+                     'up echo up', 'bridge_ports eth0 eth1', 'post-up true'):
+            self.iface.add_entry(line)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.iface, '__dict__'))
+        self.assertFalse(hasattr(Mapping('interfaces', 'mapping', 'eth0'), '__dict__'))
+
+    def test_options(self):
+        iface = self.iface
+        self.assertEqual(iface.up, 'ip route add default via 10.0.0.254')
+        self.assertEqual(iface.get_all('up'), ['ip route add default via 10.0.0.254', 'echo up'])
+        self.assertEqual(iface.bridge_ports, 'eth0 eth1')
+        self.assertEqual(iface.post_up, 'true')
+        self.assertIn('post-up', iface)
+
+        iface.add_entry('up echo up')
+        self.assertEqual(len(iface.get_all('up')), 2)
+
+        del iface.up
+        self.assertEqual(iface.up, 'echo up')
+        del iface['up']
+        self.assertNotIn('up', iface)
+        self.assertRaises(AttributeError, lambda: iface.up)
+
+        iface.mtu = '9000'
+        self.assertEqual(
+            repr(iface).splitlines(),
+            ['iface br0 inet static', '  address 10.0.0.1', '  netmask 255.255.255.0', '  bridge_ports eth0 eth1',
+             '  post-up true', '  mtu 9000'])
+
+    def test_pickle(self):
+        iface = pickle.loads(pickle.dumps(self.iface))
+        self.assertEqual(repr(iface), repr(self.iface))
+        self.assertEqual(iface.address, '10.0.0.1')
+
+    def test_render_cache(self):
+        iface = self.iface
+        text = render_stanza(iface)
+        self.assertEqual(text, repr(iface))
+        self.assertIs(render_stanza(iface), text)
+        self.assertEqual(render_stanza(iface, cache=False), text)
+
+        iface.mtu = '9000'
+        self.assertTrue(render_stanza(iface).endswith('  mtu 9000\n'))
+        del iface.mtu
+        self.assertEqual(render_stanza(iface), text)
+        iface.method = 'manual'
+        self.assertTrue(render_stanza(iface).startswith('iface br0 inet manual\n'))
+        self.assertEqual(repr(Mapping('interfaces', 'mapping', 'eth0')), 'mapping eth0\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, dirname, abspath
+
+from network_interfaces import InterfacesFile, Watcher
+
+__author__ = 'vahid'
+
+this_dir = abspath(dirname(__file__))
+data_dir = join(this_dir, 'data')
+
+
+def _events(events):
+    return sorted((e.kind, e.name) for e in events)
+
+
+class WatchCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = join(self.temp_dir, 'data')
+        shutil.copytree(data_dir, self.data_dir)
+        self.filename = join(self.data_dir, 'interfaces_one')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _edit(self, filename, old, new):
+        with open(filename) as f:
+            content = f.read()
+        with open(filename, 'w') as f:
+            f.write(content.replace(old, new))
+        # Makes sure the mtime based cache and the polling see a different file.
+        st = os.stat(filename)
+        os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def test_reload(self):
+        f = InterfacesFile(self.filename)
+        eth0 = f.get_iface('eth0')
+        wlan0 = f.get_iface('wlan0')
+
+        self._edit(self.filename, 'gateway 192.168.11.1', 'gateway 192.168.11.14')
+        self._edit(self.filename, 'allow-hotplug wlan0\niface wlan0', 'iface wlan2 inet dhcp\n\niface wlan0')
+        events = f.reload()
+        self.assertEqual(_events(events), [('added', 'wlan2'), ('modified', 'eth0'), ('modified', 'wlan0')])
+        self.assertIs(f.get_iface('eth0'), eth0)
+        self.assertEqual(eth0.gateway, '192.168.11.14')
+        self.assertIsNone(wlan0.startup)
+        self.assertEqual(f.get_iface('wlan2').method, 'dhcp')
+        self.assertEqual(f.reload(), [])
+
+        self._edit(self.filename, 'iface wlan2 inet dhcp', '')
+        events = f.reload()
+        self.assertEqual(_events(events), [('removed', 'wlan2')])
+        self.assertRaises(KeyError, f.get_iface, 'wlan2')
+
+    def test_reload_sub_files(self):
+        f = InterfacesFile(self.filename)
+        d = join(self.data_dir, 'interfaces.d')
+        with open(join(d, 'eth3'), 'w') as sub_file:
+            sub_file.write('auto eth3\niface eth3 inet dhcp\n')
+        os.remove(join(d, 'wlan1'))
+
+        events = f.reload(rescan=True)
+        self.assertEqual(_events(events), [('added', 'eth3'), ('removed', 'wlan1')])
+        self.assertEqual(f.get_iface('eth3').startup.mode, 'auto')
+        self.assertRaises(KeyError, f.get_iface, 'wlan1')
+        self.assertEqual([s.filename for s in f.sub_files],
+                         ['loopback', 'interfaces.d/eth1', 'interfaces.d/eth2', 'interfaces.d/eth3'])
+
+    def _check_watcher(self, inotify):
+        f = InterfacesFile(self.filename)
+        received = []
+        with Watcher(f, callback=received.append, interval=.01, inotify=inotify) as watcher:
+            self.assertEqual(watcher.poll(0), [])
+            self._edit(join(self.data_dir, 'interfaces.d', 'eth1'), 'dhcp', 'manual')
+            first = watcher.poll(5)
+            self.assertEqual(_events(first), [('modified', 'eth1')])
+            self.assertEqual(f.get_iface('eth1').method, 'manual')
+
+            with open(join(self.data_dir, 'interfaces.d', 'eth3'), 'w') as sub_file:
+                sub_file.write('iface eth3 inet dhcp\n')
+            events = []
+            while ('added', 'eth3') not in _events(events):
+                new_events = watcher.poll(5)
+                self.assertTrue(new_events)
+                events += new_events
+            self.assertEqual(f.get_iface('eth3').method, 'dhcp')
+
+        self.assertEqual([e for r in received for e in r], first + events)
+
+    def test_polling_watcher(self):
+        self._check_watcher(False)
+
+    @unittest.skipUnless(os.path.exists('/proc/sys/fs/inotify'), 'inotify is not available')
+    def test_inotify_watcher(self):
+        self._check_watcher(True)
+
+
+if __name__ == '__main__':
+    unittest.main()